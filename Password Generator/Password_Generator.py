@@ -1,11 +1,166 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import random
-import string
-import pyperclip
-import json
+from tkinter import ttk, messagebox
+import tkinter.font as tkfont
 import os
+import threading
+import time
 from datetime import datetime
+from breach_filter import load_breach_filter
+from password_engine import compile_policy, compile_template, generate_batch, generate_from_template
+from password_vault import CredentialIndex, PasswordReuseIndex, TrigramSearchIndex, open_vault
+from strength_estimator import estimate_strength, strength_label
+from vault_audit import audit_entries
+
+MIN_LENGTH = 4
+MAX_LENGTH = 128
+STRENGTH_DEBOUNCE_MS = 120
+STRENGTH_CACHE_SIZE = 256
+CLIPBOARD_TIMEOUT_MS = 2000
+CLIPBOARD_POLL_MS = 50
+CLIPBOARD_CLEAR_SECONDS = 30
+VAULT_POLL_MS = 2000
+SEARCH_RESULT_LIMIT = 500
+SCROLLREGION_DELAY_MS = 30
+
+class VirtualEntryList(tk.Frame):
+    """Scrollable list of saved entries that only renders the visible rows"""
+    
+    def __init__(self, parent, entries, bg, fg, border):
+        super().__init__(parent, bg=bg, highlightbackground=border, highlightthickness=1)
+        self.entries = entries
+        self.rows = range(len(entries))
+        self.offset = 0
+        self.labels = []
+        self.bg = bg
+        self.fg = fg
+        self.border = border
+        
+        self.row_font = tkfont.Font(family='Consolas', size=10)
+        # Each row is three text lines plus its padding and separator
+        self.row_height = self.row_font.metrics('linespace') * 3 + 13
+        
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.body = tk.Frame(self, bg=bg)
+        self.body.pack(side='left', fill='both', expand=True)
+        self.body.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.body)
+        
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_by(int(-1*(e.delta/120))))
+        widget.bind("<Button-4>", lambda e: self.scroll_by(-1))
+        widget.bind("<Button-5>", lambda e: self.scroll_by(1))
+        
+    def set_rows(self, rows):
+        """Show only the given entry positions"""
+        self.rows = rows
+        self.offset = 0
+        self.refresh()
+        
+    def on_resize(self, event):
+        visible = max(1, event.height // self.row_height)
+        while len(self.labels) < visible:
+            label = tk.Label(
+                self.body,
+                font=self.row_font,
+                bg=self.bg,
+                fg=self.fg,
+                anchor='nw',
+                justify='left',
+                padx=10,
+                pady=5,
+                height=3,
+                highlightbackground=self.border,
+                highlightthickness=1
+            )
+            label.pack(fill='x')
+            self.bind_wheel(label)
+            self.labels.append(label)
+        while len(self.labels) > visible:
+            self.labels.pop().destroy()
+        self.refresh()
+        
+    def on_scroll(self, action, value, unit=None):
+        if action == 'moveto':
+            self.offset = int(float(value) * len(self.rows))
+            self.refresh()
+        elif unit == 'pages':
+            self.scroll_by(int(value) * len(self.labels))
+        else:
+            self.scroll_by(int(value))
+            
+    def scroll_by(self, count):
+        self.offset += count
+        self.refresh()
+        
+    def format_entry(self, number, entry):
+        """Format one saved entry as three display lines"""
+        notes = f" | Notes: {entry['notes']}" if entry['notes'] else ""
+        history = entry.get('history')
+        versions = f" | {len(history)} previous" if history else ""
+        return (f"#{number}  {entry['website']}  ({entry['username']})\n"
+                f"Password: {entry['password']}\n"
+                f"Length: {entry['length']} | Strength: {entry['strength']} | "
+                f"Created: {entry['created_at']}{versions}{notes}")
+        
+    def refresh(self):
+        """Redraw the visible rows for the current offset"""
+        total = len(self.rows)
+        visible = len(self.labels)
+        self.offset = max(0, min(self.offset, total - visible))
+        for i, label in enumerate(self.labels):
+            index = self.offset + i
+            if index < total:
+                position = self.rows[index]
+                label.config(text=self.format_entry(position + 1, self.entries[position]))
+            else:
+                label.config(text="")
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+class LazyCard(tk.Frame):
+    """Collapsible card whose contents are only built the first time it is expanded"""
+        
+    def __init__(self, parent, title, build, bg, fg, border):
+        super().__init__(parent, bg=bg, relief='flat', bd=1, highlightbackground=border, highlightthickness=1)
+        self.title = title
+        self.build = build
+        self.body = None
+        self.expanded = False
+        
+        self.header = tk.Label(
+            self,
+            text=f"▸ {title}",
+            font=('Arial', 12, 'bold'),
+            bg=bg,
+            fg=fg,
+            cursor='hand2'
+        )
+        self.header.pack(anchor='w', fill='x')
+        self.header.bind("<Button-1>", lambda e: self.toggle())
+        
+    def toggle(self):
+        if self.expanded:
+            self.collapse()
+        else:
+            self.expand()
+        
+    def expand(self):
+        """Show the card contents, building them on first use"""
+        if self.body is None:
+            self.body = tk.Frame(self, bg=self['bg'])
+            self.build(self.body)
+        self.body.pack(fill='x', pady=(5, 0))
+        self.header.config(text=f"▾ {self.title}")
+        self.expanded = True
+        
+    def collapse(self):
+        if self.body is not None:
+            self.body.pack_forget()
+        self.header.config(text=f"▸ {self.title}")
+        self.expanded = False
 
 class ModernPasswordGenerator:
     def __init__(self, root):
@@ -28,30 +183,116 @@ class ModernPasswordGenerator:
         
         # Password storage file
         self.storage_file = "saved_passwords.json"
+        self.vault = open_vault(self.storage_file)
         self.saved_passwords = []
-        
-        # Load saved passwords
-        self.load_saved_passwords()
+        self.search_index = TrigramSearchIndex()
+        self.reuse_index = PasswordReuseIndex()
+        self.credential_index = CredentialIndex()
+        self.vault_loaded = False
+        self.vault_poll_id = None
+        # Search of the open saved passwords window, run again after a reload
+        self.saved_view_search = None
+        
+        # Clipboard backend (loaded on first copy), pending copy and auto-clear
+        self.clipboard_copy = None
+        self.clipboard_busy = False
+        self.clipboard_clear_id = None
+        
+        # Pending debounced strength update and cached strength labels
+        self.strength_after_id = None
+        self.strength_cache = {}
+        
+        # Optional offline breached password filter (see breach_filter.py)
+        self.breach_filter = load_breach_filter()
+        
+        # Background vault audit
+        self.audit_thread = None
+        self.audit_progress = (0, 0)
+        self.audit_result = None
         
         # Create scrollable frame
         self.create_scrollable_ui()
         
-    def load_saved_passwords(self):
-        """Load saved passwords from JSON file"""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'r') as f:
-                    self.saved_passwords = json.load(f)
-            except (json.JSONDecodeError, Exception):
-                self.saved_passwords = []
+        # Load saved passwords in the background so the window shows at once
+        self.load_saved_passwords()
         
-    def save_passwords_to_file(self):
-        """Save passwords to JSON file"""
+    def load_saved_passwords(self):
+        """Start loading saved passwords from the vault in the background"""
+        self.vault_loaded = False
+        self.view_btn.config(text="⏳ Loading Saved...")
+        self.vault_result = None
+        self.vault_error = None
+        self.vault_thread = threading.Thread(target=self._load_vault_worker, daemon=True)
+        self.vault_thread.start()
+        self.root.after(50, self._check_vault_loaded)
+        
+    def _load_vault_worker(self):
+        """Read the vault and build its search index off the Tk thread"""
         try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.saved_passwords, f, indent=2)
+            if self.vault.loaded:
+                # Only read what other windows or processes saved since
+                self.vault.refresh()
+                entries = self.vault.entries
+            else:
+                entries = self.vault.load()
         except Exception as e:
-            messagebox.showerror("Error", f"Could not save passwords: {str(e)}")
+            self.vault_error = e
+            entries = []
+        if entries is self.saved_passwords:
+            # Same entries with some added or rotated, the indexes are
+            # updated in place on the Tk thread
+            self.vault_result = None
+        else:
+            self.vault_result = (entries, TrigramSearchIndex(entries), PasswordReuseIndex(entries),
+                                 CredentialIndex(entries))
+        
+    def _check_vault_loaded(self):
+        """Hand the loaded vault over to the UI once the worker is done"""
+        if self.vault_thread.is_alive():
+            self.root.after(50, self._check_vault_loaded)
+            return
+        if self.vault_result is None:
+            self._update_indexes()
+        else:
+            self.saved_passwords, self.search_index, self.reuse_index, self.credential_index = self.vault_result
+            # The new indexes already cover every rotation so far
+            self.vault.take_rotated()
+        self.vault_loaded = True
+        if self.saved_view_search is not None:
+            self.saved_view_search()
+        self.view_btn.config(text="📁 View Saved")
+        if self.vault_error is not None:
+            # Polling would only run into the same error again
+            if self.vault_poll_id is not None:
+                self.root.after_cancel(self.vault_poll_id)
+                self.vault_poll_id = None
+            messagebox.showerror("Error", f"Could not load saved passwords: {str(self.vault_error)}")
+            return
+        if self.vault_poll_id is None:
+            self.vault_poll_id = self.root.after(VAULT_POLL_MS, self._poll_vault_changes)
+        
+    def _update_indexes(self):
+        """Bring the indexes up to date with entries added or rotated in place since they were built"""
+        previous = {}
+        for position, old_entry in self.vault.take_rotated():
+            # The first previous version is the one that was indexed
+            previous.setdefault(position, old_entry)
+        for position, old_entry in previous.items():
+            if position < self.search_index.size:
+                entry = self.saved_passwords[position]
+                self.search_index.update(position, old_entry, entry)
+                self.reuse_index.update(position, old_entry['password'], entry['password'])
+        for entry in self.saved_passwords[self.search_index.size:]:
+            self.search_index.add(entry)
+            self.reuse_index.add(entry)
+            self.credential_index.add(entry)
+        
+    def _poll_vault_changes(self):
+        """Reload saved passwords when another window or process changed the vault"""
+        self.vault_poll_id = self.root.after(VAULT_POLL_MS, self._poll_vault_changes)
+        # Only the vault files' size and modification time are checked here
+        if self.vault_loaded and self.vault.has_changed():
+            self.load_saved_passwords()
         
     def create_scrollable_ui(self):
         # Create main container with scrollbar
@@ -63,10 +304,10 @@ class ModernPasswordGenerator:
         scrollbar = ttk.Scrollbar(main_container, orient="vertical", command=self.canvas.yview)
         self.scrollable_frame = tk.Frame(self.canvas, bg=self.bg_color)
         
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
+        # Resizes and expanding cards fire bursts of <Configure> events;
+        # the scroll region is recomputed once per burst
+        self.scrollregion_id = None
+        self.scrollable_frame.bind("<Configure>", self._schedule_scrollregion)
         
         self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
         self.canvas.configure(yscrollcommand=scrollbar.set)
@@ -81,6 +322,14 @@ class ModernPasswordGenerator:
         
         self.setup_ui()
         
+    def _schedule_scrollregion(self, event=None):
+        if self.scrollregion_id is None:
+            self.scrollregion_id = self.root.after(SCROLLREGION_DELAY_MS, self._update_scrollregion)
+
+    def _update_scrollregion(self):
+        self.scrollregion_id = None
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
         
@@ -125,8 +374,8 @@ class ModernPasswordGenerator:
         
         self.length_scale = tk.Scale(
             length_card,
-            from_=8,
-            to=32,
+            from_=MIN_LENGTH,
+            to=MAX_LENGTH,
             orient='horizontal',
             variable=self.length_var,
             bg=self.card_bg,
@@ -143,8 +392,8 @@ class ModernPasswordGenerator:
         min_max_frame = tk.Frame(length_card, bg=self.card_bg)
         min_max_frame.pack(fill='x')
         
-        tk.Label(min_max_frame, text="8", bg=self.card_bg, fg=self.text_light).pack(side='left')
-        tk.Label(min_max_frame, text="32", bg=self.card_bg, fg=self.text_light).pack(side='right')
+        tk.Label(min_max_frame, text=str(MIN_LENGTH), bg=self.card_bg, fg=self.text_light).pack(side='left')
+        tk.Label(min_max_frame, text=str(MAX_LENGTH), bg=self.card_bg, fg=self.text_light).pack(side='right')
         
         # Character Types Section
         chars_card = self.create_card(self.scrollable_frame, "Character Types")
@@ -172,48 +421,17 @@ class ModernPasswordGenerator:
         self.create_modern_checkbox(row2, "Numbers (0-9)", self.numbers_var).pack(side='left', padx=(0, 20))
         self.create_modern_checkbox(row2, "Symbols (!@#$%)", self.symbols_var).pack(side='left')
         
-        # Security Rules Section
-        security_card = self.create_card(self.scrollable_frame, "Security Settings")
-        
+        # Security, exclusion and template rules are rarely changed, so their
+        # cards are only built the first time they are expanded
         self.no_similar_var = tk.BooleanVar(value=True)
         self.no_ambiguous_var = tk.BooleanVar(value=False)
         self.require_all_types_var = tk.BooleanVar(value=True)
-        
-        security_frame = tk.Frame(security_card, bg=self.card_bg)
-        security_frame.pack(fill='x', pady=10)
-        
-        self.create_modern_checkbox(security_frame, "Exclude similar characters (i, l, 1, L, o, 0, O)", 
-                                  self.no_similar_var).pack(anchor='w', pady=5)
-        self.create_modern_checkbox(security_frame, "Exclude ambiguous characters ({ } [ ] ( ) / \\ ' \" ` ~)", 
-                                  self.no_ambiguous_var).pack(anchor='w', pady=5)
-        self.create_modern_checkbox(security_frame, "Include all character types", 
-                                  self.require_all_types_var).pack(anchor='w', pady=5)
-        
-        # Exclude Characters Section
-        exclude_card = self.create_card(self.scrollable_frame, "Exclude Characters (Optional)")
-        
         self.exclude_var = tk.StringVar()
-        exclude_entry = tk.Entry(
-            exclude_card,
-            textvariable=self.exclude_var,
-            font=('Arial', 11),
-            bg='#f8f9fa',
-            fg=self.text_color,
-            relief='flat',
-            bd=1,
-            highlightthickness=1,
-            highlightcolor=self.accent_color,
-            highlightbackground=self.border_color
-        )
-        exclude_entry.pack(fill='x', pady=10, ipady=8)
+        self.template_var = tk.StringVar()
         
-        tk.Label(
-            exclude_card,
-            text="Enter specific characters to exclude from password",
-            font=('Arial', 9),
-            bg=self.card_bg,
-            fg=self.text_light
-        ).pack(anchor='w')
+        self.create_lazy_card(self.scrollable_frame, "Security Settings", self.build_security_settings)
+        self.create_lazy_card(self.scrollable_frame, "Exclude Characters (Optional)", self.build_exclude_characters)
+        self.create_lazy_card(self.scrollable_frame, "Password Template (Optional)", self.build_template)
         
         # Generated Password Section
         password_card = self.create_card(self.scrollable_frame, "Generated Password")
@@ -250,89 +468,11 @@ class ModernPasswordGenerator:
         )
         password_entry.pack(fill='x', ipady=12)
         
-        # Save Password Section
-        save_card = self.create_card(self.scrollable_frame, "Save Password")
-        
-        # Website/App name
-        website_frame = tk.Frame(save_card, bg=self.card_bg)
-        website_frame.pack(fill='x', pady=5)
-        
-        tk.Label(
-            website_frame,
-            text="Website/App:",
-            font=('Arial', 10, 'bold'),
-            bg=self.card_bg,
-            fg=self.text_color
-        ).pack(anchor='w')
-        
+        # Save Password Section, built on first expand
         self.website_var = tk.StringVar()
-        website_entry = tk.Entry(
-            website_frame,
-            textvariable=self.website_var,
-            font=('Arial', 11),
-            bg='#f8f9fa',
-            fg=self.text_color,
-            relief='flat',
-            bd=1,
-            highlightthickness=1,
-            highlightcolor=self.accent_color,
-            highlightbackground=self.border_color
-        )
-        website_entry.pack(fill='x', pady=5, ipady=8)
-        
-        # Username/Email
-        username_frame = tk.Frame(save_card, bg=self.card_bg)
-        username_frame.pack(fill='x', pady=5)
-        
-        tk.Label(
-            username_frame,
-            text="Username/Email:",
-            font=('Arial', 10, 'bold'),
-            bg=self.card_bg,
-            fg=self.text_color
-        ).pack(anchor='w')
-        
         self.username_var = tk.StringVar()
-        username_entry = tk.Entry(
-            username_frame,
-            textvariable=self.username_var,
-            font=('Arial', 11),
-            bg='#f8f9fa',
-            fg=self.text_color,
-            relief='flat',
-            bd=1,
-            highlightthickness=1,
-            highlightcolor=self.accent_color,
-            highlightbackground=self.border_color
-        )
-        username_entry.pack(fill='x', pady=5, ipady=8)
-        
-        # Notes
-        notes_frame = tk.Frame(save_card, bg=self.card_bg)
-        notes_frame.pack(fill='x', pady=5)
-        
-        tk.Label(
-            notes_frame,
-            text="Notes (optional):",
-            font=('Arial', 10, 'bold'),
-            bg=self.card_bg,
-            fg=self.text_color
-        ).pack(anchor='w')
-        
         self.notes_var = tk.StringVar()
-        notes_entry = tk.Entry(
-            notes_frame,
-            textvariable=self.notes_var,
-            font=('Arial', 11),
-            bg='#f8f9fa',
-            fg=self.text_color,
-            relief='flat',
-            bd=1,
-            highlightthickness=1,
-            highlightcolor=self.accent_color,
-            highlightbackground=self.border_color
-        )
-        notes_entry.pack(fill='x', pady=5, ipady=8)
+        self.save_card = self.create_lazy_card(self.scrollable_frame, "Save Password", self.build_save_form)
         
         # Action Buttons
         buttons_card = self.create_card(self.scrollable_frame, top_margin=10, bottom_margin=20)
@@ -405,6 +545,21 @@ class ModernPasswordGenerator:
         )
         self.view_btn.pack(side='left', padx=(0, 10))
         
+        # Audit Button
+        self.audit_btn = tk.Button(
+            secondary_buttons,
+            text="🛡️ Audit Vault",
+            command=self.audit_vault,
+            font=('Arial', 10),
+            bg='#d00000',
+            fg='white',
+            relief='flat',
+            padx=20,
+            pady=8,
+            cursor='hand2'
+        )
+        self.audit_btn.pack(side='left', padx=(0, 10))
+        
         # Clear Button
         self.clear_btn = tk.Button(
             secondary_buttons,
@@ -423,6 +578,148 @@ class ModernPasswordGenerator:
         # Add hover effects
         self.setup_button_hover()
         
+    def build_security_settings(self, card):
+        """Build the security rule checkboxes"""
+        security_frame = tk.Frame(card, bg=self.card_bg)
+        security_frame.pack(fill='x', pady=10)
+        
+        self.create_modern_checkbox(security_frame, "Exclude similar characters (i, l, 1, L, o, 0, O)", 
+                                  self.no_similar_var).pack(anchor='w', pady=5)
+        self.create_modern_checkbox(security_frame, "Exclude ambiguous characters ({ } [ ] ( ) / \\ ' \" ` ~)", 
+                                  self.no_ambiguous_var).pack(anchor='w', pady=5)
+        self.create_modern_checkbox(security_frame, "Include all character types", 
+                                  self.require_all_types_var).pack(anchor='w', pady=5)
+        
+    def build_exclude_characters(self, card):
+        """Build the excluded characters field"""
+        exclude_entry = tk.Entry(
+            card,
+            textvariable=self.exclude_var,
+            font=('Arial', 11),
+            bg='#f8f9fa',
+            fg=self.text_color,
+            relief='flat',
+            bd=1,
+            highlightthickness=1,
+            highlightcolor=self.accent_color,
+            highlightbackground=self.border_color
+        )
+        exclude_entry.pack(fill='x', pady=10, ipady=8)
+        
+        tk.Label(
+            card,
+            text="Enter specific characters to exclude from password",
+            font=('Arial', 9),
+            bg=self.card_bg,
+            fg=self.text_light
+        ).pack(anchor='w')
+        
+    def build_template(self, card):
+        """Build the password template field"""
+        template_entry = tk.Entry(
+            card,
+            textvariable=self.template_var,
+            font=('Consolas', 11),
+            bg='#f8f9fa',
+            fg=self.text_color,
+            relief='flat',
+            bd=1,
+            highlightthickness=1,
+            highlightcolor=self.accent_color,
+            highlightbackground=self.border_color
+        )
+        template_entry.pack(fill='x', pady=10, ipady=8)
+        
+        tk.Label(
+            card,
+            text="A = uppercase, a = lowercase, 9 = digit, ! = symbol, * = any, e.g. Aaaa-9999-!!\n"
+                 "Overrides length and character types; security rules and exclusions still apply",
+            font=('Arial', 9),
+            bg=self.card_bg,
+            fg=self.text_light,
+            justify='left'
+        ).pack(anchor='w')
+        
+    def build_save_form(self, card):
+        """Build the website, username and notes fields"""
+        # Website/App name
+        website_frame = tk.Frame(card, bg=self.card_bg)
+        website_frame.pack(fill='x', pady=5)
+        
+        tk.Label(
+            website_frame,
+            text="Website/App:",
+            font=('Arial', 10, 'bold'),
+            bg=self.card_bg,
+            fg=self.text_color
+        ).pack(anchor='w')
+        
+        website_entry = tk.Entry(
+            website_frame,
+            textvariable=self.website_var,
+            font=('Arial', 11),
+            bg='#f8f9fa',
+            fg=self.text_color,
+            relief='flat',
+            bd=1,
+            highlightthickness=1,
+            highlightcolor=self.accent_color,
+            highlightbackground=self.border_color
+        )
+        website_entry.pack(fill='x', pady=5, ipady=8)
+        
+        # Username/Email
+        username_frame = tk.Frame(card, bg=self.card_bg)
+        username_frame.pack(fill='x', pady=5)
+        
+        tk.Label(
+            username_frame,
+            text="Username/Email:",
+            font=('Arial', 10, 'bold'),
+            bg=self.card_bg,
+            fg=self.text_color
+        ).pack(anchor='w')
+        
+        username_entry = tk.Entry(
+            username_frame,
+            textvariable=self.username_var,
+            font=('Arial', 11),
+            bg='#f8f9fa',
+            fg=self.text_color,
+            relief='flat',
+            bd=1,
+            highlightthickness=1,
+            highlightcolor=self.accent_color,
+            highlightbackground=self.border_color
+        )
+        username_entry.pack(fill='x', pady=5, ipady=8)
+        
+        # Notes
+        notes_frame = tk.Frame(card, bg=self.card_bg)
+        notes_frame.pack(fill='x', pady=5)
+        
+        tk.Label(
+            notes_frame,
+            text="Notes (optional):",
+            font=('Arial', 10, 'bold'),
+            bg=self.card_bg,
+            fg=self.text_color
+        ).pack(anchor='w')
+        
+        notes_entry = tk.Entry(
+            notes_frame,
+            textvariable=self.notes_var,
+            font=('Arial', 11),
+            bg='#f8f9fa',
+            fg=self.text_color,
+            relief='flat',
+            bd=1,
+            highlightthickness=1,
+            highlightcolor=self.accent_color,
+            highlightbackground=self.border_color
+        )
+        notes_entry.pack(fill='x', pady=5, ipady=8)
+        
     def create_card(self, parent, title=None, top_margin=5, bottom_margin=5):
         """Create a modern card container"""
         card = tk.Frame(parent, bg=self.card_bg, relief='flat', bd=1, highlightbackground=self.border_color, highlightthickness=1)
@@ -440,6 +737,12 @@ class ModernPasswordGenerator:
             
         return card
         
+    def create_lazy_card(self, parent, title, build, top_margin=5, bottom_margin=5):
+        """Create a collapsed card that calls build(body) the first time it is expanded"""
+        card = LazyCard(parent, title, build, self.card_bg, self.text_color, self.border_color)
+        card.pack(fill='x', pady=(top_margin, bottom_margin), ipadx=15, ipady=10)
+        return card
+
     def create_modern_checkbox(self, parent, text, variable):
         """Create a modern-looking checkbox"""
         frame = tk.Frame(parent, bg=self.card_bg)
@@ -513,6 +816,10 @@ class ModernPasswordGenerator:
         self.view_btn.bind("<Enter>", lambda e: self.view_btn.config(bg='#5a3d7a'))
         self.view_btn.bind("<Leave>", lambda e: self.view_btn.config(bg='#6a4c93'))
         
+        # Audit button hover
+        self.audit_btn.bind("<Enter>", lambda e: self.audit_btn.config(bg='#9d0208'))
+        self.audit_btn.bind("<Leave>", lambda e: self.audit_btn.config(bg='#d00000'))
+        
         # Clear button hover
         self.clear_btn.bind("<Enter>", lambda e: self.clear_btn.config(bg='#dee2e6'))
         self.clear_btn.bind("<Leave>", lambda e: self.clear_btn.config(bg='#e9ecef'))
@@ -521,163 +828,138 @@ class ModernPasswordGenerator:
         length = int(float(value))
         self.length_var.set(length)
         self.length_value_label.config(text=str(length))
-        self.update_password_strength()
+        self.schedule_strength_update()
+        
+    def schedule_strength_update(self):
+        """Coalesce strength updates fired in quick succession into one"""
+        if self.strength_after_id is not None:
+            self.root.after_cancel(self.strength_after_id)
+        self.strength_after_id = self.root.after(STRENGTH_DEBOUNCE_MS, self.update_password_strength)
+        
+    def get_policy(self):
+        """Get the compiled policy for the current options"""
+        return compile_policy(
+            self.uppercase_var.get(),
+            self.lowercase_var.get(),
+            self.numbers_var.get(),
+            self.symbols_var.get(),
+            self.no_similar_var.get(),
+            self.no_ambiguous_var.get(),
+            self.require_all_types_var.get(),
+            self.exclude_var.get()
+        )
         
     def get_character_sets(self):
         """Get character sets based on user selection"""
-        char_sets = []
-        
-        if self.uppercase_var.get():
-            char_sets.append(string.ascii_uppercase)
-        if self.lowercase_var.get():
-            char_sets.append(string.ascii_lowercase)
-        if self.numbers_var.get():
-            char_sets.append(string.digits)
-        if self.symbols_var.get():
-            char_sets.append('!@#$%^&*()_+-=[]{}|;:,.<>?')
-        
-        return char_sets
+        return list(self.get_policy().selected_sets)
     
-    def apply_security_rules(self, char_sets):
-        """Apply security rules to character sets"""
-        excluded_chars = self.exclude_var.get()
-        
-        if self.no_similar_var.get():
-            excluded_chars += 'il1Lo0O'
-        
-        if self.no_ambiguous_var.get():
-            excluded_chars += '{}[]()/\\\'"`~,;:.<>'
-        
-        # Remove excluded characters from all sets
-        filtered_sets = []
-        for char_set in char_sets:
-            filtered_set = ''.join(char for char in char_set if char not in excluded_chars)
-            if filtered_set:  # Only add non-empty sets
-                filtered_sets.append(filtered_set)
-        
-        return filtered_sets
+    def apply_security_rules(self):
+        """Get the character sets left after applying security rules"""
+        return list(self.get_policy().char_sets)
     
     def validate_input(self):
         """Validate user input"""
-        char_sets = self.get_character_sets()
-        if not char_sets:
+        policy = self.get_policy()
+        if not policy.selected_sets:
             messagebox.showerror("Error", "Please select at least one character type!")
             return False
         
-        filtered_sets = self.apply_security_rules(char_sets)
-        if not filtered_sets:
+        if not policy.char_sets:
             messagebox.showerror("Error", "No characters available after applying security rules and exclusions!")
             return False
         
         return True
     
+    def get_template(self):
+        """Get the compiled template, or None when no template is entered"""
+        template = self.template_var.get().strip()
+        if not template:
+            return None
+        return compile_template(
+            template,
+            self.no_similar_var.get(),
+            self.no_ambiguous_var.get(),
+            self.exclude_var.get()
+        )
+    
     def generate_password(self):
         """Generate password based on user criteria"""
-        if not self.validate_input():
+        try:
+            template = self.get_template()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid template: {str(e)}")
+            return
+        if template is not None:
+            self.password_var.set(generate_from_template(template, 1)[0])
+            self.update_password_strength()
             return
         
-        length = self.length_var.get()
-        char_sets = self.get_character_sets()
-        filtered_sets = self.apply_security_rules(char_sets)
+        if not self.validate_input():
+            return
         
-        # Combine all character sets
-        all_chars = ''.join(filtered_sets)
+        policy = self.get_policy()
         
-        max_attempts = 100
-        for attempt in range(max_attempts):
-            # Generate password
-            password = ''.join(random.choice(all_chars) for _ in range(length))
-            
-            # Check if we need to require all types
-            if self.require_all_types_var.get():
-                if not self.contains_all_types(password, filtered_sets):
-                    continue
-            
-            # Password meets all criteria
-            self.password_var.set(password)
-            self.update_password_strength()
+        # Passwords that must include every type are built to contain them,
+        # so there is no retry loop and no fallback that drops the rule
+        try:
+            password = generate_batch(policy, self.length_var.get(), 1)[0]
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        # If we couldn't generate a password meeting all criteria
-        messagebox.showwarning("Warning", 
-                              "Could not generate password meeting all security rules. "
-                              "Try increasing length or relaxing some rules.")
-        self.generate_fallback_password(filtered_sets, length)
-    
-    def generate_fallback_password(self, char_sets, length):
-        """Generate a password without strict type requirements"""
-        all_chars = ''.join(char_sets)
-        password = ''.join(random.choice(all_chars) for _ in range(length))
         self.password_var.set(password)
         self.update_password_strength()
     
-    def contains_all_types(self, password, char_sets):
-        """Check if password contains at least one character from each selected type"""
-        for char_set in char_sets:
-            if not any(char in char_set for char in password):
-                return False
-        return True
-    
     def calculate_password_strength(self, password):
-        """Calculate password strength based on various factors"""
+        """Estimate password strength from the guesses needed to crack it"""
         if not password:
             return 0, "Not calculated", self.text_light
         
-        score = 0
-        length = len(password)
-        
-        # Length score
-        if length >= 8:
-            score += 1
-        if length >= 12:
-            score += 1
-        if length >= 16:
-            score += 1
-        if length >= 20:
-            score += 1
-        
-        # Character variety score
-        has_upper = any(c.isupper() for c in password)
-        has_lower = any(c.islower() for c in password)
-        has_digit = any(c.isdigit() for c in password)
-        has_symbol = any(not c.isalnum() for c in password)
-        
-        variety_count = sum([has_upper, has_lower, has_digit, has_symbol])
-        score += variety_count
-        
-        # Entropy bonus
-        unique_chars = len(set(password))
-        if unique_chars / length > 0.8:
-            score += 1
-        
-        # Determine strength level
-        if score >= 8:
-            return score, "Very Strong 🔒", self.success_color
-        elif score >= 6:
-            return score, "Strong 🔐", self.success_color
-        elif score >= 4:
-            return score, "Good 🛡️", '#4895ef'
-        elif score >= 2:
-            return score, "Weak ⚠️", self.warning_color
+        # Patterns (words, sequences, repeats, keyboard walks) are found by
+        # the estimator, which memoizes results per password
+        bits = estimate_strength(password).bits
+        strength = strength_label(bits)
+        
+        if bits >= 60:
+            return bits, strength, self.success_color
+        elif bits >= 40:
+            return bits, strength, '#4895ef'
         else:
-            return score, "Very Weak 🚨", self.warning_color
+            return bits, strength, self.warning_color
     
     def update_password_strength(self, event=None):
         """Update password strength indicator"""
+        self.strength_after_id = None
         password = self.password_var.get()
-        score, strength, color = self.calculate_password_strength(password)
-        
-        # Update strength label
-        char_sets = self.get_character_sets()
-        if not char_sets:
-            self.strength_var.set("Please select character types")
-            self.strength_label.configure(fg=self.text_light)
+        policy = self.get_policy()
+        
+        key = (password, policy, self.template_var.get().strip())
+        cached = self.strength_cache.get(key)
+        if cached is None:
+            cached = self.describe_password_strength(password, policy)
+            if len(self.strength_cache) >= STRENGTH_CACHE_SIZE:
+                self.strength_cache.clear()
+            self.strength_cache[key] = cached
+        
+        text, color = cached
+        self.strength_var.set(text)
+        self.strength_label.configure(fg=color)
+    
+    def describe_password_strength(self, password, policy):
+        """Get the strength label text and color for a password under a policy"""
+        if not policy.selected_sets and not self.template_var.get().strip():
+            return "Please select character types", self.text_light
         elif not password:
-            self.strength_var.set("Click Generate to see strength")
-            self.strength_label.configure(fg=self.text_light)
-        else:
-            self.strength_var.set(f"Strength: {strength} (Score: {score}/10)")
-            self.strength_label.configure(fg=color)
+            return "Click Generate to see strength", self.text_light
+        elif self.is_breached(password):
+            return "Strength: Breached 🚨 (found in known breached passwords)", self.warning_color
+        
+        bits, strength, color = self.calculate_password_strength(password)
+        return f"Strength: {strength} (~{bits:.0f} bits of entropy)", color
+    
+    def is_breached(self, password):
+        """Check password against the offline breached password filter, if one is installed"""
+        return self.breach_filter is not None and password in self.breach_filter
     
     def save_password(self):
         """Save the generated password with metadata"""
@@ -690,6 +972,8 @@ class ModernPasswordGenerator:
             return
             
         if not website:
+            # Open the save form in case it has not been expanded yet
+            self.save_card.expand()
             messagebox.showwarning("Warning", "Please enter a website or app name!")
             return
             
@@ -697,6 +981,40 @@ class ModernPasswordGenerator:
             messagebox.showwarning("Warning", "Please enter a username or email!")
             return
         
+        if not self.vault_loaded:
+            messagebox.showinfo("Info", "Saved passwords are still loading, please try again in a moment.")
+            return
+        
+        # Warn when the same password is already saved for another site
+        reused_for = sorted({
+            self.saved_passwords[position]['website']
+            for position in self.reuse_index.find(password)
+            if self.saved_passwords[position]['website'] != website
+        })
+        if reused_for:
+            sites = ', '.join(reused_for[:5]) + (" and others" if len(reused_for) > 5 else "")
+            if not messagebox.askyesno("Warning", f"This password is already saved for {sites}. Save it anyway?"):
+                return
+        
+        if self.is_breached(password):
+            if not messagebox.askyesno("Warning", "This password appears in a list of breached passwords. Save it anyway?"):
+                return
+        
+        # A credential that is already saved is rotated: the new password
+        # takes its place and the old one is kept in the entry's history
+        position = self.credential_index.find(website, username)
+        if position is not None:
+            answer = messagebox.askyesnocancel(
+                "Update Password",
+                f"A password for {username} at {website} is already saved.\n\n"
+                "Yes: replace it, keeping the old password in its history\n"
+                "No: save the new password as a separate entry"
+            )
+            if answer is None:
+                return
+            if not answer:
+                position = None
+        
         # Create password entry
         password_entry = {
             'website': website,
@@ -708,21 +1026,42 @@ class ModernPasswordGenerator:
             'strength': self.calculate_password_strength(password)[1]
         }
         
-        # Add to saved passwords
-        self.saved_passwords.append(password_entry)
-        
-        # Save to file
-        self.save_passwords_to_file()
+        # Write to the journal, which also updates saved passwords
+        # (after any entries other windows saved in the meantime)
+        current = self.saved_passwords[position] if position is not None else None
+        try:
+            if current is None:
+                self.vault.append(password_entry)
+            else:
+                # Keep the saved notes unless new ones were entered
+                password_entry['notes'] = password_entry['notes'] or current['notes']
+                self.vault.rotate(position, password_entry)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save passwords: {str(e)}")
+            return
+        if self.vault.entries is not self.saved_passwords:
+            # The whole vault was read again, e.g. after another process compacted it
+            self.load_saved_passwords()
+        else:
+            # Also picks up entries other windows added or rotated meanwhile
+            self._update_indexes()
         
         # Clear save fields
         self.website_var.set("")
         self.username_var.set("")
         self.notes_var.set("")
         
-        messagebox.showinfo("Success", f"Password for {website} saved successfully!")
+        if current is None:
+            messagebox.showinfo("Success", f"Password for {website} saved successfully!")
+        else:
+            messagebox.showinfo("Success", f"Password for {website} updated, the old one is kept in its history!")
     
     def view_saved_passwords(self):
         """Display saved passwords in a new window"""
+        if not self.vault_loaded:
+            messagebox.showinfo("Info", "Saved passwords are still loading, please try again in a moment.")
+            return
+        
         if not self.saved_passwords:
             messagebox.showinfo("Info", "No saved passwords found!")
             return
@@ -747,36 +1086,63 @@ class ModernPasswordGenerator:
             fg=self.text_color
         ).pack()
         
-        # Create scrollable text area
-        text_frame = tk.Frame(view_window, bg=self.bg_color)
-        text_frame.pack(fill='both', expand=True, padx=20, pady=10)
-        
-        text_widget = scrolledtext.ScrolledText(
-            text_frame,
-            wrap=tk.WORD,
-            font=('Consolas', 10),
-            bg=self.card_bg,
+        # Search box, fuzzy-matched through the trigram index on every keystroke
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            header_frame,
+            textvariable=search_var,
+            font=('Arial', 11),
+            bg='#f8f9fa',
             fg=self.text_color,
             relief='flat',
             bd=1,
-            highlightbackground=self.border_color,
-            highlightthickness=1
+            highlightthickness=1,
+            highlightcolor=self.accent_color,
+            highlightbackground=self.border_color
         )
-        text_widget.pack(fill='both', expand=True)
-        
-        # Display saved passwords
-        for i, entry in enumerate(self.saved_passwords, 1):
-            text_widget.insert(tk.END, f"Entry #{i}\n")
-            text_widget.insert(tk.END, f"Website/App: {entry['website']}\n")
-            text_widget.insert(tk.END, f"Username: {entry['username']}\n")
-            text_widget.insert(tk.END, f"Password: {entry['password']}\n")
-            text_widget.insert(tk.END, f"Length: {entry['length']} | Strength: {entry['strength']}\n")
-            if entry['notes']:
-                text_widget.insert(tk.END, f"Notes: {entry['notes']}\n")
-            text_widget.insert(tk.END, f"Created: {entry['created_at']}\n")
-            text_widget.insert(tk.END, "-" * 50 + "\n\n")
-        
-        text_widget.config(state=tk.DISABLED)
+        search_entry.pack(fill='x', pady=(10, 5), ipady=6)
+        
+        count_label = tk.Label(
+            header_frame,
+            font=('Arial', 9),
+            bg=self.card_bg,
+            fg=self.text_light
+        )
+        count_label.pack(anchor='w')
+        
+        # Only the rows that fit in the window are ever created
+        entry_list = VirtualEntryList(
+            view_window,
+            self.saved_passwords,
+            bg=self.card_bg,
+            fg=self.text_color,
+            border=self.border_color
+        )
+        entry_list.pack(fill='both', expand=True, padx=20, pady=10)
+        
+        def on_search(*args):
+            # A reload can replace the entries and the index
+            entry_list.entries = self.saved_passwords
+            query = search_var.get()
+            if not query.strip():
+                rows = self.search_index.search(query)
+                count_label.config(text=f"{len(rows)} entries")
+            else:
+                rows = self.search_index.search(query, SEARCH_RESULT_LIMIT)
+                shown = " (best matches first)" if len(rows) < SEARCH_RESULT_LIMIT else f" (best {SEARCH_RESULT_LIMIT} shown)"
+                count_label.config(text=f"{len(rows)} of {len(self.saved_passwords)} entries{shown}")
+            entry_list.set_rows(rows)
+        
+        search_var.trace_add('write', on_search)
+        on_search()
+        search_entry.focus_set()
+        
+        def on_close(event):
+            if event.widget is view_window and self.saved_view_search is on_search:
+                self.saved_view_search = None
+        
+        self.saved_view_search = on_search
+        view_window.bind("<Destroy>", on_close)
         
         # Buttons frame
         buttons_frame = tk.Frame(view_window, bg=self.bg_color)
@@ -794,39 +1160,203 @@ class ModernPasswordGenerator:
             pady=8
         ).pack(side='right')
     
+    def audit_vault(self):
+        """Audit every saved password in the background"""
+        if not self.vault_loaded:
+            messagebox.showinfo("Info", "Saved passwords are still loading, please try again in a moment.")
+            return
+        if self.audit_thread is not None and self.audit_thread.is_alive():
+            return
+        if not self.saved_passwords:
+            messagebox.showinfo("Info", "No saved passwords to audit!")
+            return
+        
+        # Audit a snapshot so saving during the audit is safe
+        entries = list(self.saved_passwords)
+        self.audit_progress = (0, len(entries))
+        self.audit_result = None
+        self.audit_thread = threading.Thread(target=self._audit_worker, args=(entries,), daemon=True)
+        self.audit_thread.start()
+        self._check_audit_done(entries)
+    
+    def _audit_worker(self, entries):
+        """Run the audit off the Tk thread, scoring in a process pool"""
+        def on_progress(done, total):
+            self.audit_progress = (done, total)
+        try:
+            self.audit_result = audit_entries(entries, workers=os.cpu_count() or 1, progress=on_progress)
+        except Exception as e:
+            self.audit_result = e
+    
+    def _check_audit_done(self, entries):
+        """Show audit progress on the button and the report when it finishes"""
+        if self.audit_thread.is_alive():
+            done, total = self.audit_progress
+            self.audit_btn.config(text=f"⏳ Auditing {done * 100 // max(total, 1)}%")
+            self.root.after(100, lambda: self._check_audit_done(entries))
+            return
+        self.audit_btn.config(text="🛡️ Audit Vault")
+        report = self.audit_result
+        if isinstance(report, Exception):
+            messagebox.showerror("Error", f"Could not audit saved passwords: {str(report)}")
+            return
+        
+        def describe(positions, limit=5):
+            names = [entries[position]['website'] for position in positions[:limit]]
+            if len(positions) > limit:
+                names.append(f"and {len(positions) - limit} more")
+            return f" ({', '.join(names)})" if names else ""
+        
+        reused = [position for group in report.reused for position in group]
+        stale = [position for position, _ in report.stale]
+        messagebox.showinfo(
+            "Vault Audit",
+            f"Audited {report.total} saved passwords\n\n"
+            f"Weak: {len(report.weak)}{describe(report.weak)}\n"
+            f"Short: {len(report.short)}{describe(report.short)}\n"
+            f"Reused: {len(reused)}{describe(reused)}\n"
+            f"Breached: {len(report.breached)}{describe(report.breached)}\n"
+            f"Outdated strength label: {len(stale)}{describe(stale)}"
+        )
+    
     def copy_to_clipboard(self):
-        """Copy generated password to clipboard"""
+        """Copy generated password to clipboard without blocking the UI"""
         password = self.password_var.get()
-        if password:
+        if not password:
+            messagebox.showwarning("Warning", "No password generated to copy!")
+            return
+        
+        if self.clipboard_busy:
+            messagebox.showinfo("Info", "Still waiting for the previous copy to finish.")
+            return
+        
+        copy = self.get_clipboard_copy()
+        if copy == self.tk_clipboard_copy:
+            # Tk's clipboard must be used from the Tk thread, and never blocks
             try:
-                pyperclip.copy(password)
-                messagebox.showinfo("Success", "Password copied to clipboard!")
+                copy(password)
             except Exception as e:
                 messagebox.showerror("Error", f"Could not copy to clipboard: {str(e)}")
-        else:
-            messagebox.showwarning("Warning", "No password generated to copy!")
+                return
+            self.on_clipboard_copied(password)
+            return
+        
+        def on_failure(error):
+            # The system clipboard tool failed or hung, use Tk's clipboard from now on
+            self.clipboard_copy = self.tk_clipboard_copy
+            try:
+                self.tk_clipboard_copy(password)
+            except Exception:
+                messagebox.showerror("Error", f"Could not copy to clipboard: {error}")
+                return
+            self.on_clipboard_copied(password)
+        
+        self.run_clipboard_task(lambda: copy(password), lambda: self.on_clipboard_copied(password), on_failure)
+    
+    def on_clipboard_copied(self, password):
+        """Schedule the clipboard to be cleared after a successful copy"""
+        if self.clipboard_clear_id is not None:
+            self.root.after_cancel(self.clipboard_clear_id)
+        self.clipboard_clear_id = self.root.after(
+            CLIPBOARD_CLEAR_SECONDS * 1000, lambda: self.clear_clipboard(password)
+        )
+        messagebox.showinfo(
+            "Success",
+            f"Password copied to clipboard! It will be cleared in {CLIPBOARD_CLEAR_SECONDS} seconds."
+        )
+    
+    def clear_clipboard(self, password):
+        """Clear the clipboard if it still holds the copied password"""
+        self.clipboard_clear_id = None
+        if self.clipboard_copy == self.tk_clipboard_copy:
+            try:
+                if self.root.clipboard_get() == password:
+                    self.root.clipboard_clear()
+            except tk.TclError:
+                pass
+            return
+        
+        def clear():
+            import pyperclip
+            if pyperclip.paste() == password:
+                pyperclip.copy("")
+        
+        if not self.clipboard_busy:
+            self.run_clipboard_task(clear, lambda: None, lambda error: None)
+    
+    def run_clipboard_task(self, task, on_success, on_failure):
+        """Run a clipboard call on a worker thread, giving up after a timeout"""
+        outcome = {}
+        
+        def worker():
+            try:
+                task()
+                outcome['done'] = True
+            except Exception as e:
+                outcome['error'] = str(e)
+        
+        deadline = time.monotonic() + CLIPBOARD_TIMEOUT_MS / 1000
+        
+        def check():
+            if 'done' in outcome:
+                self.clipboard_busy = False
+                on_success()
+            elif 'error' in outcome:
+                self.clipboard_busy = False
+                on_failure(outcome['error'])
+            elif time.monotonic() >= deadline:
+                # The worker may stay stuck; it is a daemon thread and is left behind
+                self.clipboard_busy = False
+                on_failure("the clipboard tool did not respond")
+            else:
+                self.root.after(CLIPBOARD_POLL_MS, check)
+        
+        self.clipboard_busy = True
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(CLIPBOARD_POLL_MS, check)
+    
+    def get_clipboard_copy(self):
+        """Load the clipboard backend on first copy, falling back to Tk's own clipboard"""
+        if self.clipboard_copy is None:
+            try:
+                import pyperclip
+                self.clipboard_copy = pyperclip.copy
+            except ImportError:
+                self.clipboard_copy = self.tk_clipboard_copy
+        return self.clipboard_copy
+    
+    def tk_clipboard_copy(self, text):
+        """Copy text using the Tk clipboard"""
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
     
     def clear_all(self):
         """Clear all fields"""
         self.password_var.set("")
         self.exclude_var.set("")
+        self.template_var.set("")
         self.website_var.set("")
         self.username_var.set("")
         self.notes_var.set("")
         self.update_password_strength()
 
 def main():
-    try:
-        import pyperclip
-    except ImportError:
-        print("Installing pyperclip...")
-        import subprocess
-        import sys
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyperclip"])
-        import pyperclip
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Advanced password generator")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="Print the time until the first frame is drawn, then exit")
+    args = parser.parse_args()
     
+    started = time.perf_counter()
     root = tk.Tk()
     app = ModernPasswordGenerator(root)
+    if args.startup_time:
+        # Lay out and draw the window once, as the main loop would first
+        root.update()
+        print(f"First frame after {(time.perf_counter() - started) * 1000:.1f} ms")
+        root.destroy()
+        return
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,350 @@
+# benchmark.py
+"""
+Headless benchmarks for the password generator hot paths.
+
+Measures import time of the headless modules, time to the GUI's first frame
+(when a display is available), password generation, policy
+compilation and filtering, the require-all-types check, strength scoring
+and vault save/rotate/load time, then
+writes the results as JSON so runs from different versions can be compared:
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from password_engine import (PasswordPolicy, compile_policy, compile_template, generate_batch, generate_from_template,
+                             seed_random)
+from password_vault import JournalVault
+from strength_estimator import estimate_strength
+
+LENGTHS = (8, 16, 32, 64, 128, 256, 1024)
+VAULT_SIZES = (1000, 10000, 100000)
+QUICK_LENGTHS = (8, 16, 128)
+QUICK_VAULT_SIZES = (1000, 10000)
+TEMPLATES = ('Aaaa-9999-!!', '*{32}')
+
+# name -> compile_policy keyword arguments
+POLICIES = {
+    'default': {},
+    'any_types': {'require_all_types': False},
+    'letters_only': {'numbers': False, 'symbols': False},
+    'strict_exclusions': {'no_ambiguous': True, 'exclude': 'abcxyz789'},
+}
+
+# Headless modules that must import without tkinter or pyperclip
+LOGIC_MODULES = ('password_engine', 'password_vault', 'strength_estimator',
+                 'breach_filter', 'passphrase', 'pwgen', 'vault_audit')
+GUI_MODULES = ('tkinter', 'pyperclip')
+# Import time budget for the generation engine, in seconds
+ENGINE_IMPORT_BUDGET = 0.02
+
+# Timing settings, --quick lowers them
+SETTINGS = {'repeat': 5, 'min_time': 0.2}
+
+# Slower regressions than this (relative) are flagged by --compare
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(function, repeat=None, min_time=None):
+    """
+    Time a function call
+
+    The call is repeated in a loop until a run takes at least min_time, and
+    the best of several runs is reported to filter out scheduling noise.
+
+    Returns:
+        float: Seconds per call
+    """
+    repeat = min(repeat or SETTINGS['repeat'], SETTINGS['repeat'])
+    min_time = min(min_time or SETTINGS['min_time'], SETTINGS['min_time'])
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    runs = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        runs.append(time.perf_counter() - start)
+    return min(runs) / loops
+
+
+def result(name, seconds, items=1, **params):
+    """Build one benchmark record with latency and throughput"""
+    return {
+        'name': name,
+        'params': params,
+        'seconds_per_call': seconds,
+        'items_per_second': items / seconds if seconds else None,
+    }
+
+
+def bench_generation(lengths, batch):
+    results = []
+    for policy_name, options in POLICIES.items():
+        policy = compile_policy(**options)
+        for length in lengths:
+            if policy.require_all_types and length < len(policy.char_sets):
+                continue
+            count = max(1, batch // length)
+            seconds = measure(lambda: generate_batch(policy, length, count))
+            results.append(result('generate_batch', seconds, count,
+                                  policy=policy_name, length=length, count=count))
+            seconds = measure(lambda: generate_batch(policy, length, 1))
+            results.append(result('generate_single', seconds, 1, policy=policy_name, length=length))
+
+    # What the GUI originally did: one random.choice call per character
+    import random
+    alphabet = compile_policy(require_all_types=False).alphabet
+    for length in lengths:
+        seconds = measure(lambda: ''.join(random.choice(alphabet) for _ in range(length)))
+        results.append(result('random_choice_single', seconds, 1, length=length))
+
+    for template_text in TEMPLATES:
+        template = compile_template(template_text)
+        count = max(1, batch // template.length)
+        seconds = measure(lambda: generate_from_template(template, count))
+        results.append(result('generate_template', seconds, count, template=template_text, count=count))
+    return results
+
+
+def bench_policy():
+    results = []
+    for policy_name, options in POLICIES.items():
+        # Uncached compilation (what apply_security_rules did on every call)
+        seconds = measure(lambda: PasswordPolicy(**options))
+        results.append(result('policy_compile', seconds, policy=policy_name))
+        seconds = measure(lambda: compile_policy(**options))
+        results.append(result('policy_cached', seconds, policy=policy_name))
+    return results
+
+
+def bench_contains_all_types(lengths):
+    results = []
+    policy = compile_policy(require_all_types=False)
+    for length in lengths:
+        passwords = generate_batch(policy, length, 1000)
+        seconds = measure(lambda: [policy.contains_all_types(p) for p in passwords])
+        results.append(result('contains_all_types', seconds / len(passwords), 1, length=length))
+    return results
+
+
+def bench_strength(lengths):
+    results = []
+    policy = compile_policy()
+    samples = {
+        'random': None,
+        'dictionary': 'Password123!',
+        'keyboard': 'qwertyuiop',
+    }
+    for length in lengths:
+        passwords = generate_batch(policy, length, 200)
+
+        def score_uncached():
+            estimate_strength.cache_clear()
+            for password in passwords:
+                estimate_strength(password)
+        seconds = measure(score_uncached, repeat=3)
+        results.append(result('strength_uncached', seconds / len(passwords), 1, kind='random', length=length))
+
+    for kind, password in samples.items():
+        if password is None:
+            continue
+        estimate_strength(password)
+        seconds = measure(lambda: estimate_strength(password))
+        results.append(result('strength_cached', seconds, 1, kind=kind, length=len(password)))
+    return results
+
+
+def bench_vault(sizes):
+    results = []
+    entry = {
+        'website': 'example.com',
+        'username': 'user@example.com',
+        'password': 'x' * 16,
+        'notes': '',
+        'created_at': '2024-01-01 00:00:00',
+        'length': 16,
+        'strength': 'Strong 🔐',
+    }
+    directory = tempfile.mkdtemp(prefix='pwbench-')
+    try:
+        for size in sizes:
+            path = os.path.join(directory, f'vault-{size}.json')
+            # Never compact on its own, so saves are timed without compaction
+            vault = JournalVault(path, compact_every=sys.maxsize)
+            vault.load()
+            vault.entries.extend(dict(entry, website=f'site{i}.com') for i in range(size - 1))
+            vault.compact()
+            vault.load()
+
+            def save_one():
+                vault.append(dict(entry))
+            seconds = measure(save_one, repeat=3, min_time=0.05)
+            results.append(result('vault_save', seconds, 1, size=size))
+
+            def rotate_one():
+                vault.rotate(0, entry)
+            seconds = measure(rotate_one, repeat=3, min_time=0.05)
+            results.append(result('vault_rotate', seconds, 1, size=size))
+
+            seconds = measure(vault.compact, repeat=3, min_time=0.05)
+            results.append(result('vault_compact', seconds, 1, size=size))
+
+            seconds = measure(lambda: JournalVault(path).load(), repeat=3, min_time=0.05)
+            results.append(result('vault_load', seconds, 1, size=size))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_import():
+    """Time importing each headless module in a fresh interpreter"""
+    results = []
+    directory = os.path.dirname(os.path.abspath(__file__))
+    check = "import sys; print(','.join(m for m in {!r} if m in sys.modules))".format(GUI_MODULES)
+    for module in LOGIC_MODULES:
+        times = []
+        for _ in range(SETTINGS['repeat']):
+            process = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', f"import {module}; {check}"],
+                capture_output=True, text=True, cwd=directory, check=True
+            )
+            # The last importtime line is the module itself, cumulative in microseconds
+            cumulative = process.stderr.strip().splitlines()[-1].split('|')[1]
+            times.append(int(cumulative) / 1e6)
+        record = result('import', min(times), 1, module=module)
+        record['gui_modules_loaded'] = [name for name in process.stdout.strip().split(',') if name]
+        results.append(record)
+    return results
+
+
+def bench_gui_startup():
+    """Time from creating the window to its first drawn frame, skipped without a display"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(SETTINGS['repeat']):
+        process = subprocess.run(
+            [sys.executable, 'Password_Generator.py', '--startup-time'],
+            capture_output=True, text=True, cwd=directory
+        )
+        if process.returncode != 0:
+            print("Skipping GUI startup benchmark: the window could not be opened", file=sys.stderr)
+            return []
+        # "First frame after 123.4 ms"
+        times.append(float(process.stdout.split()[-2]) / 1000)
+    return [result('gui_first_frame', min(times))]
+
+
+def check_startup(results):
+    """Print startup problems: GUI modules pulled in or a slow engine import"""
+    problems = 0
+    for record in results:
+        if record['name'] != 'import':
+            continue
+        module = record['params']['module']
+        if record['gui_modules_loaded']:
+            problems += 1
+            print(f"STARTUP {module} imports {', '.join(record['gui_modules_loaded'])}", file=sys.stderr)
+        if module == 'password_engine' and record['seconds_per_call'] > ENGINE_IMPORT_BUDGET:
+            problems += 1
+            print(f"STARTUP {module} takes {record['seconds_per_call'] * 1000:.1f} ms to import "
+                  f"(budget {ENGINE_IMPORT_BUDGET * 1000:.0f} ms)", file=sys.stderr)
+    return problems
+
+
+def result_key(record):
+    return record['name'] + json.dumps(record['params'], sort_keys=True)
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print benchmarks that got slower than the baseline run"""
+    with open(baseline_path, 'r') as f:
+        baseline = {result_key(record): record for record in json.load(f)['results']}
+    regressions = 0
+    for record in results:
+        before = baseline.get(result_key(record))
+        if before is None:
+            continue
+        change = record['seconds_per_call'] / before['seconds_per_call'] - 1
+        if change > threshold:
+            regressions += 1
+            print(f"REGRESSION {record['name']} {record['params']}: {change:+.0%}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password generation, policies, scoring and vault IO")
+    parser.add_argument('--quick', action='store_true', help="Fewer lengths and smaller vaults")
+    parser.add_argument('--output', help="Write JSON results to this file instead of stdout")
+    parser.add_argument('--compare', metavar='BASELINE', help="Flag regressions against an earlier JSON run")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown counted as a regression (default: %(default)s)")
+    parser.add_argument('--only', choices=('import', 'gui', 'generation', 'policy', 'contains', 'strength', 'vault'),
+                        action='append', help="Run only some groups (repeatable)")
+    parser.add_argument('--seed', help="Generate from a deterministic stream, so runs draw the same passwords")
+    args = parser.parse_args()
+    if args.seed is not None:
+        seed_random(args.seed)
+
+    lengths = QUICK_LENGTHS if args.quick else LENGTHS
+    vault_sizes = QUICK_VAULT_SIZES if args.quick else VAULT_SIZES
+    if args.quick:
+        SETTINGS.update(repeat=3, min_time=0.05)
+    groups = {
+        'import': bench_import,
+        'gui': bench_gui_startup,
+        'generation': lambda: bench_generation(lengths, 8192 if args.quick else 65536),
+        'policy': bench_policy,
+        'contains': lambda: bench_contains_all_types(lengths),
+        'strength': lambda: bench_strength(lengths),
+        'vault': lambda: bench_vault(vault_sizes),
+    }
+
+    results = []
+    for name, run in groups.items():
+        if args.only and name not in args.only:
+            continue
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        results.extend(run())
+
+    report = {
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    failures = check_startup(results)
+    if args.compare:
+        failures += compare(results, args.compare, args.threshold)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
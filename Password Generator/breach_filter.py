@@ -0,0 +1,161 @@
+# breach_filter.py
+"""
+Offline check against lists of known-breached passwords.
+
+A password list (one password per line, e.g. a public breach corpus) is
+compiled once into a Bloom filter file. The file is memory-mapped when it is
+checked, so only the pages touched by a lookup are read from disk and a
+filter for hundreds of millions of passwords costs almost no RAM. A lookup
+hashes the password once and tests a handful of bits.
+
+Bloom filters can report false positives (at the rate chosen when building)
+but never false negatives.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+MAGIC = b'PWBLOOM1'
+HEADER = struct.Struct('<8sQI')
+DEFAULT_FILTER_FILE = 'breached_passwords.bloom'
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+
+def _bit_positions(password, num_bits, num_hashes):
+    """Get the filter bits for a password using double hashing"""
+    digest = hashlib.blake2b(password.encode('utf-8'), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], 'little')
+    second = int.from_bytes(digest[8:], 'little') | 1
+    return [(first + i * second) % num_bits for i in range(num_hashes)]
+
+
+class BreachFilter:
+    """Memory-mapped Bloom filter of breached passwords"""
+
+    def __init__(self, path=DEFAULT_FILTER_FILE):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files cannot be mapped
+            self.file.close()
+            raise ValueError(f"{path} is not a breached password filter")
+        # Too short for a header, or a header for a different or damaged file
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a breached password filter")
+        magic, self.num_bits, self.num_hashes = HEADER.unpack_from(self.map, 0)
+        if (magic != MAGIC or not self.num_bits or not self.num_hashes
+                or len(self.map) < HEADER.size + (self.num_bits + 7) // 8):
+            self.close()
+            raise ValueError(f"{path} is not a breached password filter")
+
+    def __contains__(self, password):
+        bits = self.map
+        for position in _bit_positions(password, self.num_bits, self.num_hashes):
+            if not bits[HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def close(self):
+        """Unmap and close the filter file"""
+        self.map.close()
+        self.file.close()
+
+
+def load_breach_filter(path=DEFAULT_FILTER_FILE):
+    """
+    Open the breached password filter if one has been built
+
+    Args:
+        path (str): Filter file path
+
+    Returns:
+        BreachFilter or None: The filter, or None if it is missing or invalid
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return BreachFilter(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def _read_passwords(wordlist_path):
+    """Yield the passwords in a wordlist, one per line"""
+    with open(wordlist_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            password = line.rstrip('\r\n')
+            if password:
+                yield password
+
+
+def build_breach_filter(wordlist_path, output_path=DEFAULT_FILTER_FILE,
+                        false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+    """
+    Compile a password list into a Bloom filter file
+
+    The filter is written straight into a memory-mapped output file, so
+    building needs no more RAM than checking.
+
+    Args:
+        wordlist_path (str): Text file with one password per line
+        output_path (str): Filter file to write
+        false_positive_rate (float): Target false positive rate
+
+    Returns:
+        int: Number of passwords added
+    """
+    count = sum(1 for _ in _read_passwords(wordlist_path))
+    num_bits = max(64, math.ceil(-max(count, 1) * math.log(false_positive_rate) / math.log(2) ** 2))
+    num_hashes = max(1, round(num_bits / max(count, 1) * math.log(2)))
+
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, num_bits, num_hashes))
+        f.truncate(HEADER.size + (num_bits + 7) // 8)
+    with open(temp_path, 'r+b') as f:
+        with mmap.mmap(f.fileno(), 0) as bits:
+            for password in _read_passwords(wordlist_path):
+                for position in _bit_positions(password, num_bits, num_hashes):
+                    bits[HEADER.size + (position >> 3)] |= 1 << (position & 7)
+            bits.flush()
+    os.replace(temp_path, output_path)
+    return count
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline breached password filter")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Compile a password list into a filter")
+    build_parser.add_argument('wordlist')
+    build_parser.add_argument('output', nargs='?', default=DEFAULT_FILTER_FILE)
+    build_parser.add_argument('--fp-rate', type=float, default=DEFAULT_FALSE_POSITIVE_RATE,
+                              help="Target false positive rate (default: %(default)s)")
+
+    check_parser = subparsers.add_parser('check', help="Check passwords against a filter")
+    check_parser.add_argument('passwords', nargs='+')
+    check_parser.add_argument('--filter', default=DEFAULT_FILTER_FILE)
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        count = build_breach_filter(args.wordlist, args.output, args.fp_rate)
+        print(f"Added {count} passwords to {args.output}")
+    elif args.command == 'check':
+        breach_filter = load_breach_filter(args.filter)
+        if breach_filter is None:
+            parser.exit(1, f"Error: could not open {args.filter}\n")
+        for password in args.passwords:
+            status = "BREACHED" if password in breach_filter else "not found"
+            print(f"{password}: {status}")
+        breach_filter.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# passphrase.py
+"""
+Diceware-style passphrase generation.
+
+Words are picked uniformly from a local wordlist (one word per line; lines
+like "11111<tab>abacus" from dice wordlists use their last field). The
+wordlist is memory-mapped together with an offset index stored next to it
+(wordlist path + ".idx", rebuilt whenever the wordlist changes), so picking
+a word is O(1) and a 100k-word list is never loaded into memory.
+"""
+from array import array
+import math
+import mmap
+import os
+import struct
+
+from password_engine import randbelow
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'PWWIDX01'
+# magic, word count, wordlist size, wordlist mtime in nanoseconds
+INDEX_HEADER = struct.Struct('<8sQQQ')
+DEFAULT_WORDLIST = 'wordlist.txt'
+CAPITALIZE_MODES = ('none', 'all', 'random')
+
+
+def _scan_words(data):
+    """Yield (start, end) offsets of the word on each non-empty line"""
+    position = 0
+    size = len(data)
+    while position < size:
+        end = data.find(b'\n', position)
+        if end == -1:
+            end = size
+        line = data[position:end].rstrip(b'\r')
+        fields = line.split()
+        if fields:
+            word = fields[-1]
+            start = position + line.rfind(word)
+            yield start, start + len(word)
+        position = end + 1
+
+
+class Wordlist:
+    """Memory-mapped wordlist with O(1) access to any word"""
+
+    def __init__(self, path=DEFAULT_WORDLIST):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.file = open(path, 'rb')
+        stat = os.fstat(self.file.fileno())
+        if not stat.st_size:
+            self.file.close()
+            raise ValueError(f"{path} is empty")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index_file = None
+        self.index_map = None
+        self.offsets = self._open_index(stat)
+        self.count = len(self.offsets) // 2
+        if not self.count:
+            self.close()
+            raise ValueError(f"{path} contains no words")
+
+    def _open_index(self, stat):
+        """Map the offset index, building it first if it is missing or stale"""
+        if not self._index_is_current(stat):
+            offsets = array('Q', (offset for pair in _scan_words(self.map) for offset in pair))
+            header = INDEX_HEADER.pack(INDEX_MAGIC, len(offsets) // 2, stat.st_size, stat.st_mtime_ns)
+            try:
+                temp_path = self.index_path + '.tmp'
+                with open(temp_path, 'wb') as f:
+                    f.write(header)
+                    offsets.tofile(f)
+                os.replace(temp_path, self.index_path)
+            except OSError:
+                # Read-only location: keep the index in memory instead
+                return memoryview(offsets)
+
+        self.index_file = open(self.index_path, 'rb')
+        self.index_map = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self.index_map)[INDEX_HEADER.size:].cast('Q')
+
+    def _index_is_current(self, stat):
+        """Check the index on disk was built from this version of the wordlist"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                header = f.read(INDEX_HEADER.size)
+            magic, count, size, mtime_ns = INDEX_HEADER.unpack(header)
+        except (OSError, struct.error):
+            return False
+        return (magic == INDEX_MAGIC and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+                and os.path.getsize(self.index_path) == INDEX_HEADER.size + count * 16)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError("word index out of range")
+        start = self.offsets[2 * index]
+        end = self.offsets[2 * index + 1]
+        return self.map[start:end].decode('utf-8', errors='replace')
+
+    def close(self):
+        """Unmap and close the wordlist and its index"""
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        if self.index_map is not None:
+            self.index_map.close()
+            self.index_file.close()
+        self.map.close()
+        self.file.close()
+
+
+def passphrase_entropy(wordlist_size, words, capitalize='none', add_digit=False):
+    """
+    Exact entropy of a passphrase configuration in bits
+
+    Assumes the words in the list are distinct and lowercase.
+
+    Args:
+        wordlist_size (int): Number of words in the list
+        words (int): Number of words in the passphrase
+        capitalize (str): 'none', 'all' or 'random' (each word 50/50)
+        add_digit (bool): Whether a random digit is appended to a random word
+
+    Returns:
+        float: Entropy in bits
+    """
+    bits = words * math.log2(wordlist_size)
+    if capitalize == 'random':
+        bits += words
+    if add_digit:
+        bits += math.log2(10 * words)
+    return bits
+
+
+def generate_passphrase(wordlist, words=6, separator='-', capitalize='none', add_digit=False):
+    """
+    Generate a passphrase from uniformly chosen words
+
+    Args:
+        wordlist (Wordlist): Words to choose from
+        words (int): Number of words
+        separator (str): Text placed between words
+        capitalize (str): 'none', 'all' or 'random' (each word 50/50)
+        add_digit (bool): Append a random digit to a randomly chosen word
+
+    Returns:
+        str: The passphrase
+    """
+    if words < 1:
+        raise ValueError("A passphrase needs at least one word")
+    if capitalize not in CAPITALIZE_MODES:
+        raise ValueError(f"capitalize must be one of {', '.join(CAPITALIZE_MODES)}")
+
+    chosen = [wordlist[randbelow(len(wordlist))] for _ in range(words)]
+    if capitalize == 'all':
+        chosen = [word.capitalize() for word in chosen]
+    elif capitalize == 'random':
+        chosen = [word.capitalize() if randbelow(2) else word for word in chosen]
+    if add_digit:
+        position = randbelow(words)
+        chosen[position] += str(randbelow(10))
+    return separator.join(chosen)
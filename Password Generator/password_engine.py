@@ -0,0 +1,758 @@
+# password_engine.py
+"""
+Headless password generation engine.
+
+Everything in here is independent of Tk so that the GUI, command-line tools
+and provisioning scripts can share the same generation logic. Randomness is
+drawn from os.urandom in large blocks through a small buffered pool (see
+EntropyPool) and mapped onto the alphabet with a single bytes.translate
+call, instead of one random.choice per character.
+
+Passwords can also follow a template such as "Aaaa-9999-!!" (see
+compile_template), for targets that require a fixed format.
+"""
+import _thread
+import bisect
+import functools
+import itertools
+import math
+import operator
+import os
+
+# Spelled out rather than taken from the string module, which imports re
+UPPERCASE = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+LOWERCASE = 'abcdefghijklmnopqrstuvwxyz'
+DIGITS = '0123456789'
+SYMBOLS = '!@#$%^&*()_+-=[]{}|;:,.<>?'
+SIMILAR_CHARS = 'il1Lo0O'
+AMBIGUOUS_CHARS = '{}[]()/\\\'"`~,;:.<>'
+
+# Random bytes buffered for small reads
+ENTROPY_POOL_SIZE = 4096
+# Most set patterns weighed in one draw when building require-all-types
+# passwords; each draw places the sets of as many characters as that allows
+COVERAGE_PATTERNS = 1024
+
+# Template placeholders -> (uppercase, lowercase, numbers, symbols)
+TEMPLATE_CLASSES = {
+    'A': (True, False, False, False),
+    'a': (False, True, False, False),
+    '9': (False, False, True, False),
+    '!': (False, False, False, True),
+    '*': (True, True, True, True),
+}
+
+
+class PasswordPolicy:
+    """
+    Compiled, immutable character options for password generation
+
+    The filtered character sets, the combined alphabet and the byte lookup
+    tables are worked out once here. Use compile_policy to share instances
+    between callers with the same options.
+    """
+
+    __slots__ = ('uppercase', 'lowercase', 'numbers', 'symbols', 'no_similar',
+                 'no_ambiguous', 'require_all_types', 'exclude',
+                 'selected_sets', 'char_sets', 'alphabet', 'translation', 'class_table')
+
+    def __init__(self, uppercase=True, lowercase=True, numbers=True, symbols=True,
+                 no_similar=True, no_ambiguous=False, require_all_types=True, exclude=''):
+        selected_sets = []
+        if uppercase:
+            selected_sets.append(UPPERCASE)
+        if lowercase:
+            selected_sets.append(LOWERCASE)
+        if numbers:
+            selected_sets.append(DIGITS)
+        if symbols:
+            selected_sets.append(SYMBOLS)
+
+        excluded_chars = set(exclude)
+        if no_similar:
+            excluded_chars.update(SIMILAR_CHARS)
+        if no_ambiguous:
+            excluded_chars.update(AMBIGUOUS_CHARS)
+
+        char_sets = []
+        for char_set in selected_sets:
+            filtered_set = ''.join(char for char in char_set if char not in excluded_chars)
+            if filtered_set:
+                char_sets.append(filtered_set)
+        alphabet = ''.join(char_sets)
+
+        # Maps each allowed character to the 1-based index of its set, so
+        # set membership of a whole password is one bytes.translate call
+        class_table = bytearray(256)
+        for index, char_set in enumerate(char_sets, 1):
+            for char in char_set:
+                class_table[ord(char)] = index
+
+        values = {
+            'uppercase': uppercase,
+            'lowercase': lowercase,
+            'numbers': numbers,
+            'symbols': symbols,
+            'no_similar': no_similar,
+            'no_ambiguous': no_ambiguous,
+            'require_all_types': require_all_types,
+            'exclude': exclude,
+            'selected_sets': tuple(selected_sets),
+            'char_sets': tuple(char_sets),
+            'alphabet': alphabet,
+            'translation': build_translation(alphabet) if alphabet else None,
+            'class_table': bytes(class_table),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PasswordPolicy is immutable, use compile_policy to get another one")
+
+    def __repr__(self):
+        return (f"PasswordPolicy(uppercase={self.uppercase}, lowercase={self.lowercase}, "
+                f"numbers={self.numbers}, symbols={self.symbols}, no_similar={self.no_similar}, "
+                f"no_ambiguous={self.no_ambiguous}, require_all_types={self.require_all_types}, "
+                f"exclude={self.exclude!r})")
+
+    def contains_all_types(self, password):
+        """Check if password contains at least one character from each character set"""
+        classes = set(password.encode('ascii', 'ignore').translate(self.class_table))
+        return len(classes - {0}) == len(self.char_sets)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_policy(uppercase=True, lowercase=True, numbers=True, symbols=True,
+                   no_similar=True, no_ambiguous=False, require_all_types=True, exclude=''):
+    """
+    Get the shared compiled policy for a set of options
+
+    Policies are cached on the option values, so the GUI, the command line
+    and batch callers reuse the same alphabets and tables.
+
+    Returns:
+        PasswordPolicy: Compiled policy
+    """
+    return PasswordPolicy(uppercase, lowercase, numbers, symbols,
+                          no_similar, no_ambiguous, require_all_types, exclude)
+
+
+class EntropyPool:
+    """
+    Buffered source of cryptographically secure random bytes
+
+    Small reads (a few bytes for randbelow, a short password's characters)
+    are served from a buffer refilled with one os.urandom call, so they no
+    longer cost a system call each; large reads go straight to os.urandom.
+    Bytes are never handed out twice, and the buffer is dropped in a child
+    process after a fork so parent and child never share it.
+
+    seed switches the pool to a deterministic SHAKE-256 stream, which makes
+    benchmarks reproducible. Never generate real passwords while seeded.
+    """
+
+    def __init__(self, size=ENTROPY_POOL_SIZE):
+        self.size = size
+        self.lock = _thread.allocate_lock()
+        # Buffer of size bytes, used up to offset; empty until the first read
+        self.buffer = b''
+        self.offset = size
+        self.seed_key = None
+        self.counter = 0
+
+    def seed(self, seed=None):
+        """
+        Use a deterministic stream derived from seed, or os.urandom again for None
+
+        Args:
+            seed (int, str or bytes): Seed for reproducible output
+        """
+        if isinstance(seed, int):
+            seed = str(seed)
+        if isinstance(seed, str):
+            seed = seed.encode('utf-8')
+        with self.lock:
+            self.seed_key = seed
+            self.counter = 0
+            self.buffer = b''
+            self.offset = self.size
+
+    def _source(self, n):
+        if self.seed_key is None:
+            return os.urandom(n)
+        # Only imported when seeded, it adds a few milliseconds to startup
+        import hashlib
+
+        self.counter += 1
+        block = hashlib.shake_256(self.counter.to_bytes(8, 'little') + self.seed_key)
+        return block.digest(n)
+
+    def read(self, n):
+        """Get n random bytes"""
+        with self.lock:
+            start = self.offset
+            end = start + n
+            if end <= self.size:
+                self.offset = end
+                return self.buffer[start:end]
+            if n >= self.size:
+                return self._source(n)
+            # Whatever is left of the old buffer is thrown away
+            self.buffer = self._source(self.size)
+            self.offset = n
+            return self.buffer[:n]
+
+    def reset(self):
+        """Drop the buffered bytes"""
+        self.buffer = b''
+        self.offset = self.size
+        # A lock held by another thread at fork time stays held in the child
+        self.lock = _thread.allocate_lock()
+
+
+_pool = EntropyPool()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_pool.reset)
+
+
+def seed_random(seed=None):
+    """
+    Make generation deterministic for reproducible benchmarks
+
+    Every generator in this module (and passphrase) draws from the same
+    pool, so after seed_random(42) the same calls give the same passwords.
+    Processes forked while seeded all continue the same stream.
+    seed_random() switches back to os.urandom.
+
+    Args:
+        seed (int, str or bytes): Seed, or None for secure randomness
+    """
+    _pool.seed(seed)
+
+
+def randbelow(n):
+    """
+    Get a uniformly random integer in [0, n) from the entropy pool
+
+    Used instead of the secrets module, which pulls in random, hmac and
+    base64 and noticeably slows down importing this module.
+    """
+    if n <= 0:
+        raise ValueError("Upper bound must be positive")
+    bits = n.bit_length()
+    size = (bits + 7) // 8
+    shift = size * 8 - bits
+    read = _pool.read
+    while True:
+        value = int.from_bytes(read(size), 'big') >> shift
+        if value < n:
+            return value
+
+
+def build_translation(alphabet):
+    """
+    Build a bytes.translate table mapping random bytes onto an alphabet
+
+    Bytes at or above the largest multiple of len(alphabet) are rejected so
+    that every character is equally likely.
+
+    Args:
+        alphabet (str): ASCII characters to draw from
+
+    Returns:
+        tuple: (table, rejected bytes, accepted byte count)
+    """
+    size = len(alphabet)
+    if not size or size > 256:
+        raise ValueError("Alphabet must contain between 1 and 256 characters")
+    encoded = alphabet.encode('ascii')
+    limit = 256 - 256 % size
+    table = bytes(encoded[b % size] if b < limit else 0 for b in range(256))
+    return table, bytes(range(limit, 256)), limit
+
+
+def random_chars(translation, count):
+    """
+    Draw count uniformly distributed alphabet characters in bulk
+
+    Args:
+        translation (tuple): Result of build_translation
+        count (int): Number of characters to produce
+
+    Returns:
+        bytes: ASCII characters from the alphabet
+    """
+    table, rejected, limit = translation
+    # Over-request slightly so a single read usually suffices; small reads
+    # come from the pool, so another round is cheap
+    chunk = _pool.read(count * 256 // limit + (count >> 5) + 8).translate(table, rejected)
+    if len(chunk) >= count:
+        return chunk[:count]
+    chunks = [chunk]
+    have = len(chunk)
+    while have < count:
+        missing = count - have
+        chunk = _pool.read(missing * 256 // limit + (missing >> 5) + 8).translate(table, rejected)
+        chunks.append(chunk)
+        have += len(chunk)
+    return b''.join(chunks)[:count]
+
+
+@functools.lru_cache(maxsize=4096)
+def _completions(set_sizes, missing, remaining):
+    """
+    Count strings of a given length that use every set flagged in a bitmask
+
+    Uses inclusion-exclusion over the missing sets, which is cheap because
+    there are at most four character sets.
+
+    Args:
+        set_sizes (tuple): Size of each (disjoint) character set
+        missing (int): Bitmask of sets that still have to appear
+        remaining (int): Number of characters left to place
+
+    Returns:
+        int: Number of qualifying strings
+    """
+    total_size = sum(set_sizes)
+    count = 0
+    subset = missing
+    while True:
+        dropped = sum(size for i, size in enumerate(set_sizes) if subset >> i & 1)
+        sign = -1 if bin(subset).count('1') % 2 else 1
+        count += sign * (total_size - dropped) ** remaining
+        if not subset:
+            return count
+        subset = (subset - 1) & missing
+
+
+@functools.lru_cache(maxsize=16)
+def _set_patterns(set_sizes, span):
+    """
+    List every way of picking a set for each of span characters
+
+    Args:
+        set_sizes (tuple): Size of each (disjoint) character set
+        span (int): Number of characters
+
+    Returns:
+        tuple: (patterns as bytes of set indexes, number of character
+        strings each pattern stands for, bitmask of the sets each uses)
+    """
+    patterns = []
+    strings = []
+    masks = []
+    for indexes in itertools.product(range(len(set_sizes)), repeat=span):
+        patterns.append(bytes(indexes))
+        strings.append(math.prod(set_sizes[index] for index in indexes))
+        masks.append(functools.reduce(operator.or_, (1 << index for index in indexes)))
+    return tuple(patterns), tuple(strings), tuple(masks)
+
+
+def _block_span(set_count):
+    """Number of characters whose sets are drawn together, so that there are at most COVERAGE_PATTERNS patterns"""
+    span = 1
+    while set_count ** (span + 1) <= COVERAGE_PATTERNS:
+        span += 1
+    return span
+
+
+@functools.lru_cache(maxsize=256)
+def _block_plan(set_count, length):
+    """
+    Split a password into blocks of characters whose sets are drawn together
+
+    Returns:
+        tuple: (characters in the block, characters left after it) per block
+    """
+    span = _block_span(set_count)
+    return tuple((min(span, length - start), max(length - start - span, 0))
+                 for start in range(0, length, span))
+
+
+@functools.lru_cache(maxsize=64)
+def _coverage_block(set_sizes, missing, span, rest):
+    """
+    Work out the weighted choices for the sets of the next span characters
+
+    Every set pattern (see _set_patterns) is weighted by the number of valid
+    passwords it leads to: the character strings it stands for times the
+    ways to finish the rest characters after it with the sets it leaves
+    missing. Patterns that lead nowhere are dropped.
+
+    A pattern is picked with a 64-bit random number and a binary search
+    over the cumulative weights scaled to 64 bits. Only a number equal to a
+    scaled bound that was rounded down can fall either side of it; those
+    are listed so _exact_choice can settle them.
+
+    Args:
+        set_sizes (tuple): Size of each (disjoint) character set
+        missing (int): Bitmask of sets that still have to appear
+        span (int): Number of characters in the block
+        rest (int): Number of characters left after the block
+
+    Returns:
+        tuple: (number of valid completions, cumulative weights, cumulative
+        weights scaled to 64 bits, scaled weights that were rounded,
+        patterns, sets still missing after each pattern)
+    """
+    total = _completions(set_sizes, missing, span + rest)
+    patterns, strings, masks = _set_patterns(set_sizes, span)
+    # Ways to finish the password for each combination of sets the block uses
+    finishes = [_completions(set_sizes, missing & ~mask, rest) for mask in range(1 << len(set_sizes))]
+    weights = list(map(operator.mul, strings, map(finishes.__getitem__, masks)))
+    bounds = tuple(itertools.accumulate(itertools.compress(weights, weights)))
+    scaled, remainders = zip(*[divmod(bound << 64, total) for bound in bounds])
+    rounded = frozenset(itertools.compress(scaled, remainders))
+    after = tuple(missing & ~mask for mask in itertools.compress(masks, weights))
+    return total, bounds, scaled, rounded, tuple(itertools.compress(patterns, weights)), after
+
+
+def _exact_choice(bounds, total, value):
+    """
+    Settle which choice a 64-bit random number falls in when it is on a rounded bound
+
+    More random bits are appended until the range the number stands for
+    lies within one choice. Each round is needed with odds of about 1 in 2**64.
+    """
+    bits = 64
+    while True:
+        low = value * total
+        index = sum(1 for bound in bounds if bound << bits <= low)
+        if low + total <= bounds[index] << bits:
+            return index
+        value = value << 64 | int.from_bytes(_pool.read(8), 'little')
+        bits += 64
+
+
+def _covering_sets(set_sizes, missing, length):
+    """
+    Draw the set of each character of one password, a block at a time
+
+    Args:
+        set_sizes (tuple): Size of each (disjoint) character set
+        missing (int): Bitmask of sets that still have to appear
+        length (int): Number of characters to place
+
+    Returns:
+        bytes: Set index of each character, len(set_sizes) for characters
+        free to come from any set
+    """
+    plan = _block_plan(len(set_sizes), length)
+    sets = b''
+    # One 64-bit number for each block the password can take
+    for value, (span, rest) in zip(memoryview(_pool.read(8 * len(plan))).cast('Q'), plan):
+        total, bounds, scaled, rounded, patterns, after = _coverage_block(set_sizes, missing, span, rest)
+        pick = _exact_choice(bounds, total, value) if value in rounded else bisect.bisect_right(scaled, value)
+        sets += patterns[pick]
+        missing = after[pick]
+        if not missing:
+            break
+    return sets + bytes([len(set_sizes)]) * (length - len(sets))
+
+
+@functools.lru_cache(maxsize=64)
+def _set_translations(char_sets):
+    """
+    Lookup tables for each set and then the whole alphabet
+
+    Returns:
+        tuple: (bytes.translate table per set index, table turning that set
+        index into 0xff and every other byte into 0, table per set index
+        indexed by a 16-bit random number)
+    """
+    alphabets = [alphabet.encode('ascii') for alphabet in char_sets + (''.join(char_sets),)]
+    # Numbers at or above the largest multiple of the alphabet size map to 0
+    tables = tuple(alphabet * (256 // len(alphabet)) + bytes(256 % len(alphabet)) for alphabet in alphabets)
+    selectors = tuple(bytes(0xff if byte == index else 0 for byte in range(256)) for index in range(len(tables)))
+    wide_tables = tuple(alphabet * (65536 // len(alphabet)) + bytes(65536 % len(alphabet)) for alphabet in alphabets)
+    return tables, selectors, wide_tables
+
+
+# Turns accepted characters into 0xff, keeping rejected bytes at 0
+_ACCEPTED = bytes([0]) + bytes([0xff]) * 255
+
+
+def _draw_chars(char_sets, sets):
+    """
+    Draw a character from the given set for every position
+
+    A few characters are looked up one by one with 16-bit random numbers.
+    Large draws take one bytes.translate pass per set over the whole
+    buffer instead, selecting each set's positions with big-integer masks.
+    Characters whose random number was rejected are drawn again together
+    and spliced in.
+
+    Args:
+        char_sets (tuple): Disjoint, non-empty character sets
+        sets (bytes): Set index of each character (see _covering_sets)
+
+    Returns:
+        str: The characters
+    """
+    tables, selectors, wide_tables = _set_translations(char_sets)
+    size = len(sets)
+    if size <= 64:
+        random = memoryview(_pool.read(2 * size)).cast('H')
+        data = bytes(map(operator.getitem, map(wide_tables.__getitem__, sets), random))
+    else:
+        random = _pool.read(size)
+        value = 0
+        for table, selector in zip(tables, selectors):
+            value |= (int.from_bytes(sets.translate(selector), 'little')
+                      & int.from_bytes(random.translate(table), 'little'))
+        data = value.to_bytes(size, 'little')
+    text = data.decode('ascii')
+    if '\0' not in text:
+        return text
+    # 0xff everywhere but the rejected positions, which keep their set index
+    marked = int.from_bytes(sets, 'little') | int.from_bytes(data.translate(_ACCEPTED), 'little')
+    redrawn = _draw_chars(char_sets, marked.to_bytes(size, 'little').translate(None, b'\xff'))
+    pieces = text.split('\0')
+    return ''.join(itertools.chain.from_iterable(zip(pieces, redrawn))) + pieces[-1]
+
+
+def _covering_passwords(char_sets, length, count):
+    """
+    Generate count passwords that contain every character set
+
+    First the set of every character is drawn, a block of characters at a
+    time: a weighted draw (see _coverage_block) picks the sets of the next
+    few characters out of every pattern, until each set has appeared; the
+    rest may come from any set. That makes the passwords uniformly
+    distributed over all passwords containing every set, with no retries.
+    Then every character is drawn from its set in one go (see _draw_chars).
+
+    The block draws of a batch are made together: one pool read and one
+    map over the whole batch per block, with each password searching the
+    table for the sets it still misses. Once only a few passwords still
+    miss a set, they finish one at a time.
+
+    Args:
+        char_sets (tuple): Disjoint, non-empty character sets
+        length (int): Password length
+        count (int): Number of passwords to generate
+
+    Returns:
+        list: Generated passwords
+    """
+    set_sizes = tuple(map(len, char_sets))
+    full = (1 << len(set_sizes)) - 1
+    # A handful of passwords is quicker to build one at a time
+    if count < 16:
+        return [_draw_chars(char_sets, _covering_sets(set_sizes, full, length)) for _ in range(count)]
+
+    span = _block_span(len(set_sizes))
+
+    # Set index of every character of every password, row by row
+    sets = bytearray([len(set_sizes)]) * (length * count)
+    missing = [full] * count
+    position = 0
+    while position < length:
+        unfinished = count - missing.count(0)
+        # Another round over the whole batch is not worth it for the few
+        # passwords that still miss a set
+        if unfinished * 16 <= count:
+            for index in itertools.compress(range(count), missing):
+                start = index * length
+                sets[start + position:start + length] = _covering_sets(set_sizes, missing[index], length - position)
+            break
+
+        span = min(span, length - position)
+        rest = length - position - span
+        blocks = {mask: _coverage_block(set_sizes, mask, span, rest) for mask in set(missing) if mask}
+        # Finished passwords take the one pattern of characters from any set
+        blocks[0] = (1, (1,), (1 << 64,), frozenset(), (bytes([len(set_sizes)]) * span,), (0,))
+        scaled = {mask: block[2] for mask, block in blocks.items()}
+        values = memoryview(_pool.read(8 * count)).cast('Q')
+        picks = list(map(bisect.bisect_right, map(scaled.__getitem__, missing), values))
+        rounded = frozenset().union(*(block[3] for block in blocks.values()))
+        if not rounded.isdisjoint(values):
+            for index, value in enumerate(values):
+                if value in rounded:
+                    total, bounds = blocks[missing[index]][:2]
+                    picks[index] = _exact_choice(bounds, total, value)
+
+        patterns = {mask: block[4] for mask, block in blocks.items()}
+        after = {mask: block[5] for mask, block in blocks.items()}
+        drawn = b''.join(map(operator.getitem, map(patterns.__getitem__, missing), picks))
+        for offset in range(span):
+            sets[position + offset::length] = drawn[offset::span]
+        missing = list(map(operator.getitem, map(after.__getitem__, missing), picks))
+        position += span
+
+    text = _draw_chars(char_sets, bytes(sets))
+    return [text[i:i + length] for i in range(0, length * count, length)]
+
+
+def password_entropy(policy, length):
+    """
+    Exact entropy in bits of one password generated with a policy
+
+    Args:
+        policy (PasswordPolicy): Character options
+        length (int): Password length
+
+    Returns:
+        float: log2 of the number of equally likely passwords
+    """
+    if not policy.char_sets:
+        return 0.0
+    if not policy.require_all_types:
+        return length * math.log2(len(policy.alphabet))
+    sizes = tuple(len(char_set) for char_set in policy.char_sets)
+    possible = _completions(sizes, (1 << len(sizes)) - 1, length)
+    return math.log2(possible) if possible else 0.0
+
+
+def generate_batch(policy, length, count):
+    """
+    Generate a batch of passwords without touching Tk
+
+    Args:
+        policy (PasswordPolicy): Character options to generate with
+        length (int): Length of each password
+        count (int): Number of passwords to generate
+
+    Returns:
+        list: Generated passwords
+    """
+    if length < 1:
+        raise ValueError("Password length must be at least 1")
+    char_sets = policy.char_sets
+    if not char_sets:
+        raise ValueError("No characters available after applying security rules and exclusions!")
+    translation = policy.translation
+
+    # Every password drawn from a single set already contains it
+    if not policy.require_all_types or len(char_sets) == 1:
+        total = length * count
+        data = random_chars(translation, total).decode('ascii')
+        return [data[i:i + length] for i in range(0, total, length)]
+
+    if length < len(char_sets):
+        raise ValueError(f"Password length must be at least {len(char_sets)} to include all character types")
+
+    return _covering_passwords(char_sets, length, count)
+
+
+class PasswordTemplate:
+    """
+    Compiled password template with one alphabet per position
+
+    Positions sharing a placeholder share an alphabet, so generation draws
+    each alphabet once in bulk for the whole batch. Use compile_template to
+    share instances between callers.
+    """
+
+    __slots__ = ('template', 'length', 'literal', 'fields')
+
+    def __init__(self, template, no_similar=True, no_ambiguous=False, exclude=''):
+        literal = bytearray()
+        positions = {}
+        index = 0
+        while index < len(template):
+            char = template[index]
+            index += 1
+            if char == '\\':
+                if index == len(template):
+                    raise ValueError("Template ends with an unfinished escape")
+                char = template[index]
+                index += 1
+                placeholder = None
+            else:
+                placeholder = char if char in TEMPLATE_CLASSES else None
+
+            repeat = 1
+            if index < len(template) and template[index] == '{':
+                end = template.find('}', index)
+                if end == -1 or not template[index + 1:end].isdigit():
+                    raise ValueError(f"Invalid repeat count in template at position {index + 1}")
+                repeat = int(template[index + 1:end])
+                index = end + 1
+
+            if placeholder is None:
+                if not char.isascii() or not char.isprintable():
+                    raise ValueError(f"Template character {char!r} is not printable ASCII")
+                literal.extend(char.encode('ascii') * repeat)
+            else:
+                positions.setdefault(placeholder, []).extend(range(len(literal), len(literal) + repeat))
+                literal.extend(b'\0' * repeat)
+
+        if not literal:
+            raise ValueError("Template is empty")
+
+        fields = []
+        for placeholder, field_positions in positions.items():
+            policy = compile_policy(*TEMPLATE_CLASSES[placeholder], no_similar, no_ambiguous, False, exclude)
+            if not policy.alphabet:
+                raise ValueError(f"No characters available for '{placeholder}' after applying security rules and exclusions!")
+            fields.append((policy.alphabet, policy.translation, tuple(field_positions)))
+
+        values = {
+            'template': template,
+            'length': len(literal),
+            'literal': bytes(literal),
+            'fields': tuple(fields),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PasswordTemplate is immutable, use compile_template to get another one")
+
+    def __repr__(self):
+        return f"PasswordTemplate({self.template!r})"
+
+    def entropy(self):
+        """Exact entropy in bits of one password generated from this template"""
+        return sum(len(positions) * math.log2(len(alphabet)) for alphabet, _, positions in self.fields)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_template(template, no_similar=True, no_ambiguous=False, exclude=''):
+    """
+    Get the shared compiled template for a pattern and security options
+
+    In a template, A is an uppercase letter, a a lowercase letter, 9 a digit,
+    ! a symbol and * any of them. Any other character is kept as is, and a
+    backslash keeps the next character as is (\\A is a literal A). A
+    placeholder or character followed by {n} is repeated n times, so
+    "Aa{3}-9{4}-!{2}" is the same as "Aaaa-9999-!!". The similar, ambiguous
+    and excluded characters are left out of every placeholder.
+
+    Args:
+        template (str): Pattern to compile
+        no_similar (bool): Exclude similar characters (i, l, 1, L, o, 0, O)
+        no_ambiguous (bool): Exclude ambiguous characters
+        exclude (str): Specific characters to exclude
+
+    Returns:
+        PasswordTemplate: Compiled template
+    """
+    return PasswordTemplate(template, no_similar, no_ambiguous, exclude)
+
+
+def generate_from_template(template, count):
+    """
+    Generate a batch of passwords following a compiled template
+
+    Each placeholder's characters for the whole batch come from one bulk
+    draw and are written into the output with one slice assignment per
+    position, so the Python-level work does not grow with count.
+
+    Args:
+        template (PasswordTemplate): Compiled template
+        count (int): Number of passwords to generate
+
+    Returns:
+        list: Generated passwords
+    """
+    length = template.length
+    data = bytearray(template.literal * count)
+    for _, translation, positions in template.fields:
+        chars = random_chars(translation, len(positions) * count)
+        for i, position in enumerate(positions):
+            data[position::length] = chars[i * count:(i + 1) * count]
+    text = data.decode('ascii')
+    return [text[i:i + length] for i in range(0, length * count, length)]
@@ -0,0 +1,1919 @@
+# password_vault.py
+"""
+Storage for saved passwords.
+
+The vault is kept as a JSON snapshot (saved_passwords.json) plus an
+append-only journal next to it. Saving one entry appends one line to the
+journal instead of rewriting the whole file; the journal is folded back into
+the snapshot every so often.
+
+For large vaults there is also an SQLite backend with indexes on website,
+username and creation time. Running this file with "migrate" copies the
+JSON vault into it once; after that open_vault picks the database.
+
+Saving a new password for a website and username that are already saved
+rotates that entry instead of adding another one: the entry keeps its place
+and the versions it replaces are kept in a short history on it, storing only
+what changed (password and time, plus strength or notes when those differ).
+
+Vaults can be exported to and imported from JSON Lines or CSV files. Both
+directions stream one entry at a time, so moving a vault of any size takes
+constant memory apart from the duplicate index kept while importing.
+
+In memory, entries are VaultRecord tuples rather than dicts, which take a
+fraction of the memory on large vaults and still read like the dicts they
+replace (record['website']). The snapshot stores entries field by field in
+blocks that turn straight into records; snapshots written as a plain list of
+entry dicts by earlier versions are still read.
+"""
+from array import array
+import bisect
+import contextlib
+import functools
+import gc
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+JOURNAL_SUFFIX = '.log'
+LOCK_SUFFIX = '.lock'
+SQLITE_SUFFIX = '.db'
+DEFAULT_COMPACT_EVERY = 1000
+# Previous versions kept for each entry
+DEFAULT_HISTORY_LIMIT = 10
+ENTRY_FIELDS = ('website', 'username', 'password', 'notes', 'created_at', 'length', 'strength')
+_ENTRY_FIELD_SET = frozenset(ENTRY_FIELDS)
+EXPORT_FORMATS = ('jsonl', 'csv')
+IMPORT_BATCH_SIZE = 1000
+STREAM_CHUNK_SIZE = 1 << 16
+# Bytes of a bitset scanned at a time when listing search results
+BIT_SCAN_BLOCK = 256
+
+COMPACT_WRITE_BATCH = 1000
+# Layout of the saved snapshot, see JournalVault.compact
+SNAPSHOT_FORMAT = 2
+
+# Reused encoder; json.dumps builds a new one whenever options are passed
+_encode_compact = json.JSONEncoder(separators=(',', ':')).encode
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+# "00" to "59" -> int, for strict and fast parsing of minutes and seconds
+_SEXAGESIMAL = {f'{value:02d}': value for value in range(60)}
+
+
+# "YYYY-MM-DD HH" -> seconds, a plain dict because it is hit for every entry
+_hour_starts = {}
+_HOUR_CACHE_SIZE = 1 << 16
+
+
+def _hour_start(text):
+    """Seconds at the start of a "YYYY-MM-DD HH" hour, or None if invalid"""
+    if len(text) != 13 or text[10] != ' ' or not text.isascii():
+        return None
+    hour = _SEXAGESIMAL.get(text[11:])
+    if hour is None or hour > 23:
+        return None
+    try:
+        day = date.fromisoformat(text[:10])
+    except ValueError:
+        return None
+    if day.isoformat() != text[:10]:
+        return None
+    return (day.toordinal() - _EPOCH_ORDINAL) * 86400 + hour * 3600
+
+
+@functools.lru_cache(maxsize=4096)
+def _day_text(days):
+    """YYYY-MM-DD date for a number of days since 1970-01-01"""
+    return date.fromordinal(days + _EPOCH_ORDINAL).isoformat()
+
+
+def parse_timestamp(text):
+    """
+    Convert a saved "YYYY-MM-DD HH:MM:SS" time to whole seconds
+
+    The seconds count from 1970-01-01 00:00:00 in the same (local) time the
+    text is in, so converting back gives the same text on any machine.
+
+    Returns:
+        int or None: Seconds, or None if text is not in that format
+    """
+    if len(text) != 19 or text[13] != ':' or text[16] != ':':
+        return None
+    hour = text[:13]
+    start = _hour_starts.get(hour)
+    if start is None:
+        start = _hour_start(hour)
+        if start is None:
+            return None
+        if len(_hour_starts) >= _HOUR_CACHE_SIZE:
+            _hour_starts.clear()
+        _hour_starts[hour] = start
+    minutes = _SEXAGESIMAL.get(text[14:16])
+    seconds = _SEXAGESIMAL.get(text[17:])
+    if minutes is None or seconds is None:
+        return None
+    return start + minutes * 60 + seconds
+
+
+def format_timestamp(value):
+    """Convert seconds from parse_timestamp back to YYYY-MM-DD HH:MM:SS text"""
+    days, seconds = divmod(value, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{_day_text(days)} {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+_tuple_item = tuple.__getitem__
+_FIELD_INDEX = {field: index for index, field in enumerate(ENTRY_FIELDS)}
+# Fields with few distinct values, stored once per snapshot block
+_SHARED_FIELDS = frozenset(('website', 'username', 'strength'))
+# Optional items after the entry fields of a record
+_HISTORY_INDEX = len(ENTRY_FIELDS)
+_EXTRA_INDEX = _HISTORY_INDEX + 1
+
+
+def _field(index):
+    """Read-only attribute for one item of a record"""
+    return property(lambda self: _tuple_item(self, index))
+
+
+class VaultRecord(tuple):
+    """
+    Compact in-memory saved entry
+
+    A tuple of the fields in ENTRY_FIELDS order, followed by the history and
+    then any fields this version does not know about when there are some, so
+    a whole snapshot block can be turned into records by tuple.__new__
+    without a Python-level call per entry. One copy of each website, username
+    and strength label is shared between entries, and created_at is kept as
+    whole seconds (see parse_timestamp). Reading it like a dict
+    (record['website'], record.get('notes')) gives the same values as the
+    saved JSON entry, and to_dict converts it back exactly.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, website, username, password, notes='', created_at='', length=None, strength='', extra=None,
+                history=None):
+        if isinstance(created_at, str):
+            timestamp = parse_timestamp(created_at)
+            # Times in any other format are kept as text so they round-trip
+            created_at = timestamp if timestamp is not None else created_at
+        fields = (sys.intern(website), sys.intern(username), password, notes, created_at,
+                  len(password) if length is None else length,
+                  sys.intern(strength) if isinstance(strength, str) else strength)
+        if extra:
+            fields += (history or None, extra)
+        elif history:
+            fields += (history,)
+        return tuple.__new__(cls, fields)
+
+    website = _field(0)
+    username = _field(1)
+    password = _field(2)
+    notes = _field(3)
+    created_at = _field(4)
+    length = _field(5)
+    strength = _field(6)
+
+    @property
+    def history(self):
+        """
+        Previous versions, newest first, or None
+
+        Each is a list of [password, created_at] followed by strength and
+        notes only where they differ from the next newer version.
+        """
+        return _tuple_item(self, _HISTORY_INDEX) if len(self) > _HISTORY_INDEX else None
+
+    @property
+    def extra(self):
+        """Fields this version does not know about, kept for round-tripping, or None"""
+        return _tuple_item(self, _EXTRA_INDEX) if len(self) > _EXTRA_INDEX else None
+
+    @classmethod
+    def from_dict(cls, entry):
+        """Build a record from a saved entry dict"""
+        if len(entry) == len(ENTRY_FIELDS):
+            try:
+                return cls(entry['website'], entry['username'], entry['password'], entry['notes'],
+                           entry['created_at'], entry['length'], entry['strength'])
+            except KeyError:
+                pass
+        extra = {key: value for key, value in entry.items()
+                 if key not in _ENTRY_FIELD_SET and key != 'history'} or None
+        return cls(entry.get('website', ''), entry.get('username', ''), entry.get('password', ''),
+                   entry.get('notes', ''), entry.get('created_at', ''), entry.get('length'),
+                   entry.get('strength', ''), extra, entry.get('history'))
+
+    def created_text(self):
+        """Get created_at in the saved "YYYY-MM-DD HH:MM:SS" format"""
+        if isinstance(self.created_at, int):
+            return format_timestamp(self.created_at)
+        return self.created_at
+
+    def to_dict(self):
+        """Get the saved entry dict for this record"""
+        entry = dict(zip(ENTRY_FIELDS, self))
+        entry['created_at'] = self.created_text()
+        if self.extra:
+            entry.update(self.extra)
+        if self.history:
+            entry['history'] = self.history
+        return entry
+
+    def rotated(self, entry, limit=DEFAULT_HISTORY_LIMIT):
+        """
+        Get the record for a new version of this entry
+
+        Website, username and unknown fields stay the same and this version
+        becomes the newest one in the history, which is cut to limit versions.
+
+        Args:
+            entry (dict): New version; only password, notes, created_at,
+                length and strength are used
+            limit (int): Previous versions to keep
+
+        Returns:
+            VaultRecord: The new record
+        """
+        notes = entry.get('notes', '')
+        strength = entry.get('strength', '')
+        version = [self.password, self.created_text(), self.strength, self.notes]
+        newer = (None, None, strength, notes)
+        while len(version) > 2 and version[-1] == newer[len(version) - 1]:
+            version.pop()
+        history = ([version] + (self.history or []))[:limit] or None
+        return VaultRecord(self.website, self.username, entry.get('password', ''), notes,
+                           entry.get('created_at', ''), entry.get('length'), strength, self.extra, history)
+
+    def versions(self):
+        """
+        Get every version of this entry, newest (the current one) first
+
+        Returns:
+            list: Entry dicts without history
+        """
+        current = self.to_dict()
+        current.pop('history', None)
+        versions = [current]
+        for version in self.history or ():
+            previous = dict(versions[-1], password=version[0], created_at=version[1], length=len(version[0]))
+            if len(version) > 2:
+                previous['strength'] = version[2]
+            if len(version) > 3:
+                previous['notes'] = version[3]
+            versions.append(previous)
+        return versions
+
+    def __getitem__(self, field):
+        if not isinstance(field, str):
+            # Plain tuple indexing
+            return _tuple_item(self, field)
+        if field == 'created_at':
+            return self.created_text()
+        index = _FIELD_INDEX.get(field)
+        if index is not None:
+            return _tuple_item(self, index)
+        if field == 'history' and self.history:
+            return self.history
+        if self.extra and field in self.extra:
+            return self.extra[field]
+        raise KeyError(field)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __getnewargs__(self):
+        return tuple(self[:_HISTORY_INDEX]) + (self.extra, self.history)
+
+    def __eq__(self, other):
+        if isinstance(other, VaultRecord):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"VaultRecord({self.to_dict()!r})"
+
+
+def as_record(entry):
+    """Get a VaultRecord for an entry dict or record"""
+    return entry if isinstance(entry, VaultRecord) else VaultRecord.from_dict(entry)
+
+
+def as_dict(entry):
+    """Get the saved entry dict for an entry dict or record"""
+    return entry.to_dict() if isinstance(entry, VaultRecord) else entry
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector while a vault is parsed
+
+    Unlike dicts of plain values, records are tracked by the collector. They
+    can never form cycles, so there is no point in it repeatedly scanning the
+    new records while a large vault is read.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _snapshot_block(records):
+    """
+    Snapshot block for a run of records
+
+    Holds a list per entry field, except that the few distinct websites,
+    usernames and strength labels are stored once each and referred to by
+    index. The histories and unknown fields of the records that have any are
+    kept by position in the block.
+    """
+    block = {}
+    for field, column in zip(ENTRY_FIELDS, zip(*records)):
+        if field in _SHARED_FIELDS:
+            index = {}
+            positions = [index.setdefault(value, len(index)) for value in column]
+            block[field] = {'values': list(index), 'index': positions}
+        else:
+            block[field] = list(column)
+    for key, item in (('history', _HISTORY_INDEX), ('extra', _EXTRA_INDEX)):
+        values = {str(offset): record[item] for offset, record in enumerate(records)
+                  if len(record) > item and record[item]}
+        if values:
+            block[key] = values
+    return block
+
+
+def _block_records(block):
+    """Records for a snapshot block, see _snapshot_block"""
+    columns = []
+    sizes = set()
+    for field in ENTRY_FIELDS:
+        column = block[field]
+        if field in _SHARED_FIELDS:
+            values = [sys.intern(value) if isinstance(value, str) else value for value in column['values']]
+            column = column['index']
+            sizes.add(len(column))
+            column = map(values.__getitem__, column)
+        else:
+            sizes.add(len(column))
+        columns.append(column)
+    if len(sizes) != 1:
+        raise ValueError("Snapshot block with fields of different lengths")
+    records = list(map(tuple.__new__, itertools.repeat(VaultRecord), zip(*columns)))
+    histories = block.get('history') or {}
+    extras = block.get('extra') or {}
+    for key in histories.keys() | extras.keys():
+        offset = int(key)
+        records[offset] = VaultRecord(*records[offset][:_HISTORY_INDEX], extra=extras.get(key),
+                                      history=histories.get(key))
+    return records
+
+
+def _parse_snapshot(data):
+    """
+    Parse the snapshot text into records
+
+    Snapshots are a header followed by blocks of up to COMPACT_WRITE_BATCH
+    entries stored field by field (see JournalVault.compact). Snapshots from
+    before blocks were used are a list of entry dicts; those are converted
+    one entry at a time, and JournalVault.load rewrites them as blocks.
+
+    Returns:
+        tuple: (generation or None, list of records)
+    """
+    with _gc_paused():
+        items = json.loads(data)
+        if not _is_snapshot_header(items[0] if items else None):
+            return None, [VaultRecord.from_dict(item) for item in items]
+        records = []
+        for block in itertools.islice(items, 1, None):
+            records += _block_records(block)
+        return items[0].get('generation'), records
+
+
+class VaultFormatError(ValueError):
+    """The snapshot was written in a format this version cannot read"""
+
+
+def _is_snapshot_header(item):
+    """Check whether the first item of a snapshot is a header, rejecting unknown formats"""
+    if not (isinstance(item, dict) and 'format' in item):
+        return False
+    if item['format'] != SNAPSHOT_FORMAT:
+        raise VaultFormatError(f"Unsupported vault format {item['format']!r}")
+    return True
+
+
+def _snapshot_generation(path):
+    """Generation in the header of a snapshot file, None if it has none or is missing"""
+    try:
+        with open(path, 'r') as f:
+            first = next(_iter_json_array(f), None)
+    except FileNotFoundError:
+        return None
+    return first.get('generation') if _is_snapshot_header(first) else None
+
+
+def _new_generation():
+    """Random id for a newly written snapshot"""
+    return os.urandom(8).hex()
+
+
+def _iter_snapshot(f):
+    """Yield every record of an open snapshot file, holding one block at a time"""
+    items = _iter_json_array(f)
+    first = next(items, None)
+    if first is None:
+        return
+    if not _is_snapshot_header(first):
+        yield VaultRecord.from_dict(first)
+        for item in items:
+            yield VaultRecord.from_dict(item)
+        return
+    for block in items:
+        yield from _block_records(block)
+
+
+def _rotation_record(position, record):
+    """
+    Journal record for a rotated entry, leaving out the history
+
+    The entry is named by its position as well as its website and username,
+    so the record is never applied to a different entry.
+    """
+    return {
+        'rotate': position,
+        'website': record.website,
+        'username': record.username,
+        'password': record.password,
+        'notes': record.notes,
+        'created_at': record.created_text(),
+        'length': record.length,
+        'strength': record.strength,
+    }
+
+
+# Start of every rotation record in the journal
+_ROTATION_PREFIX = b'{"rotate":'
+
+
+def _is_entry(record):
+    """Check whether a journal record is a saved entry rather than a header or rotation"""
+    return isinstance(record, dict) and 'website' in record and 'rotate' not in record
+
+
+def _rotation_applies(record, rotation):
+    """
+    Check whether a journal rotation is for this record and not yet applied
+
+    Rotations naming another website or username are skipped, and so is a
+    rotation whose new version the record already is.
+    """
+    return (record.website == rotation.get('website') and record.username == rotation.get('username')
+            and (record.password != rotation.get('password') or record.created_text() != rotation.get('created_at')))
+
+
+def _apply_journal(entries, records, history_limit):
+    """
+    Add journal records to entries, applying rotations to the entries in place
+
+    Returns:
+        list: (position, previous record) of every rotated entry
+    """
+    rotated = []
+    for record in records:
+        if _is_entry(record):
+            entries.append(VaultRecord.from_dict(record))
+        elif isinstance(record, dict) and isinstance(record.get('rotate'), int) and 0 <= record['rotate'] < len(entries):
+            position = record['rotate']
+            if _rotation_applies(entries[position], record):
+                rotated.append((position, entries[position]))
+                entries[position] = entries[position].rotated(record, history_limit)
+    return rotated
+
+
+def _journal_folded(header, generation, snapshot_size, added):
+    """
+    Check whether a journal was already folded into the snapshot
+
+    That happens when a compaction is interrupted after replacing the
+    snapshot but before starting a new journal. Every compaction gives the
+    snapshot a new generation, which the journal started after it repeats in
+    its header, so a journal of another generation was folded in already.
+    Snapshots and journals from before generations fall back to comparing
+    entry counts.
+
+    Args:
+        header (dict or None): Journal header
+        generation (str or None): Snapshot generation
+        snapshot_size (int or None): Entries in the snapshot; only needed
+            when neither has a generation
+        added (int): Entries added by the journal
+    """
+    if header is None:
+        return False
+    if generation is not None:
+        return header.get('generation') != generation
+    if 'generation' in header:
+        # The snapshot was replaced by something other than a compaction
+        return False
+    base = header.get('base')
+    return base is not None and base != snapshot_size and base + added == snapshot_size
+
+
+def _lock_file(f):
+    """Block until the advisory lock on an open file is held"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(f):
+    """Release the advisory lock on an open file"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _iter_json_array(f, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the items of a JSON array from a text file one at a time
+
+    Only the item being parsed and one chunk of the file are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    started = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position == len(buffer) and not eof:
+            chunk = f.read(chunk_size)
+            buffer, position, eof = chunk, 0, not chunk
+            continue
+        if position == len(buffer):
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError("Expected a JSON array")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The item runs past the end of the buffer, read more
+            chunk = f.read(chunk_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+        if end == len(buffer) and not eof:
+            # A number could continue in the next chunk, parse it again
+            chunk = f.read(chunk_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+        yield item
+        position = end
+
+
+class VaultLock:
+    """
+    Advisory lock shared by every process using a vault
+
+    Held on a separate lock file (the vault path + ".lock") so the vault
+    files themselves can be replaced atomically. The lock is re-entrant and
+    also serialises threads within one process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.depth = 0
+        self.thread_lock = threading.RLock()
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                if self.file is None:
+                    self.file = open(self.path, 'a+b')
+                _lock_file(self.file)
+            except BaseException:
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            _unlock_file(self.file)
+        self.thread_lock.release()
+
+    def close(self):
+        """Close the lock file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def _file_signature(path):
+    """Identity, size and modification time of a file, or None if missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class JournalVault:
+    """
+    Password vault stored as a JSON snapshot plus an append-only journal
+
+    Every change happens under a VaultLock and files are only ever rewritten
+    through a temporary file and an atomic rename, so several windows or
+    scripts can share one vault. Changes made by others are picked up with
+    refresh, which only looks at the files' size and modification time and
+    reads just the new journal records when that is all that changed.
+
+    Rotating an entry appends a small record naming its position, website,
+    username and the new password; it is applied to the entry in memory when
+    the journal is read. The snapshot and the journal started after it share
+    a generation id, which tells whether a journal was already folded in.
+    """
+
+    def __init__(self, path, compact_every=DEFAULT_COMPACT_EVERY, history_limit=DEFAULT_HISTORY_LIMIT):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.lock = VaultLock(path + LOCK_SUFFIX)
+        self.compact_every = compact_every
+        self.history_limit = history_limit
+        self.entries = []
+        self.loaded = False
+        # (position, previous record) of entries rotated since take_rotated
+        self.rotated = []
+        self.journal_records = 0
+        # What the in-memory entries were read from: the snapshot's
+        # generation and signature, the journal's signature and how far it
+        # was read
+        self.generation = None
+        self.snapshot_signature = None
+        self.journal_signature = None
+        self.journal_offset = 0
+
+    def load(self):
+        """
+        Load the snapshot and replay the journal on top of it
+
+        A torn last journal line (left by a crash mid-append) is cut off.
+        An unreadable snapshot loads as empty, but one in a format this
+        version does not know raises VaultFormatError, so that saving never
+        overwrites it. A snapshot in the original list of entries format is
+        compacted right away, so only the first load pays for converting it.
+
+        Returns:
+            list: All saved entries
+        """
+        with self.lock:
+            generation, entries = None, []
+            self.rotated = []
+            self.snapshot_signature = _file_signature(self.path)
+            legacy = False
+            if self.snapshot_signature is not None:
+                try:
+                    with open(self.path, 'r') as f:
+                        generation, entries = _parse_snapshot(f.read())
+                    # Only snapshots in the original format have no generation
+                    legacy = generation is None and bool(entries)
+                except VaultFormatError:
+                    raise
+                except (json.JSONDecodeError, Exception):
+                    generation, entries = None, []
+            self.generation = generation
+
+            header, records = self._read_journal()
+            added = sum(1 for record in records if _is_entry(record))
+            if _journal_folded(header, generation, len(entries), added):
+                # A compaction already folded this journal into the snapshot
+                # but was interrupted before it could reset the journal
+                self._reset_journal(len(entries), generation)
+            else:
+                _apply_journal(entries, records, self.history_limit)
+                self.journal_records = len(records)
+
+            self.entries = entries
+            self.loaded = True
+            if legacy:
+                self.compact()
+        return entries
+
+    def has_changed(self):
+        """
+        Check whether another process saved to the vault since it was read
+
+        Only the files' metadata is looked at, so this is cheap enough to
+        poll.
+        """
+        return (_file_signature(self.path) != self.snapshot_signature
+                or _file_signature(self.journal_path) != self.journal_signature)
+
+    def refresh(self):
+        """
+        Bring the loaded entries up to date with changes saved by others
+
+        New journal records are read on their own and added to the end of
+        entries. After a compaction by another process the whole vault is
+        loaded again, replacing the entries list.
+
+        Returns:
+            bool: Whether anything changed
+        """
+        if not self.has_changed():
+            return False
+        with self.lock:
+            return self._sync()
+
+    def _sync(self):
+        """Catch up with the files on disk, the lock must be held"""
+        journal_signature = _file_signature(self.journal_path)
+        if (_file_signature(self.path) == self.snapshot_signature
+                and journal_signature == self.journal_signature):
+            return False
+        if (_file_signature(self.path) == self.snapshot_signature
+                and journal_signature is not None and self.journal_signature is not None
+                and journal_signature[0] == self.journal_signature[0]
+                and journal_signature[1] >= self.journal_offset):
+            # Same files, only appended to: read just the new records
+            _, records = self._read_journal(self.journal_offset)
+            self.rotated += _apply_journal(self.entries, records, self.history_limit)
+            self.journal_records += len(records)
+            return bool(records)
+        self.load()
+        return True
+
+    def take_rotated(self):
+        """
+        Get the entries rotated in place since the last call
+
+        Covers rotations by other processes picked up while syncing as well
+        as this vault's own, so indexes over entries can be brought up to
+        date without reading the vault again. Loading the vault again, which
+        replaces entries, starts over.
+
+        Returns:
+            list: (position, previous record) pairs, oldest rotation first
+        """
+        rotated, self.rotated = self.rotated, []
+        return rotated
+
+    def iter_entries(self):
+        """
+        Yield every saved entry without loading the vault into memory
+
+        Follows the same rules as load for a journal that was already folded
+        into the snapshot, but never modifies the files. Rotations in the
+        journal are collected first and applied to entries as they are
+        yielded.
+        """
+        header, added, rotations = self._scan_journal()
+        generation = _snapshot_generation(self.path)
+        count = 0
+        folded = None
+        if header is None or generation is not None or 'generation' in header:
+            folded = _journal_folded(header, generation, None, added)
+        elif rotations:
+            # Without generations, whether the journal was already folded into
+            # the snapshot decides if its rotations apply, so the snapshot has
+            # to be counted first
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    count = sum(1 for _ in _iter_snapshot(f))
+            folded = _journal_folded(header, None, count, added)
+            count = 0
+        if folded:
+            rotations = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                for record in _iter_snapshot(f):
+                    yield self._rotate_entry(record, rotations.get(count))
+                    count += 1
+        if folded is None:
+            folded = _journal_folded(header, None, count, added)
+        if not os.path.exists(self.journal_path) or folded:
+            # Missing, or already folded into the snapshot by an interrupted compaction
+            return
+
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                # A line without a newline is a torn append
+                if not line.endswith(b'\n'):
+                    break
+                if line.startswith(_ROTATION_PREFIX):
+                    continue
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if not _is_entry(record):
+                    continue
+                yield self._rotate_entry(record, rotations.get(count))
+                count += 1
+
+    def _scan_journal(self):
+        """
+        Read the journal's header, count its new entries and collect its rotations
+
+        Entry records are only counted, not parsed.
+
+        Returns:
+            tuple: (header or None, number of new entries, {position: [rotation records]})
+        """
+        header = None
+        added = 0
+        rotations = {}
+        if not os.path.exists(self.journal_path):
+            return header, added, rotations
+        with open(self.journal_path, 'rb') as f:
+            for number, line in enumerate(f):
+                if not line.endswith(b'\n'):
+                    break
+                if line.startswith(_ROTATION_PREFIX):
+                    try:
+                        record = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    if isinstance(record.get('rotate'), int):
+                        rotations.setdefault(record['rotate'], []).append(record)
+                    continue
+                if number == 0:
+                    try:
+                        record = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        record = None
+                    if isinstance(record, dict) and 'base' in record and 'website' not in record:
+                        header = record
+                        continue
+                added += 1
+        return header, added, rotations
+
+    def _rotate_entry(self, entry, rotations):
+        """Apply journal rotations to a streamed entry and get its dict"""
+        if not rotations:
+            return as_dict(entry)
+        record = as_record(entry)
+        for rotation in rotations:
+            if _rotation_applies(record, rotation):
+                record = record.rotated(rotation, self.history_limit)
+        return record.to_dict()
+
+    def _read_journal(self, offset=0):
+        """
+        Read the journal header and records from offset, dropping a torn last line
+
+        The lock must be held. Remembers how far the journal was read.
+
+        Returns:
+            tuple: (header or None, list of records)
+        """
+        self.journal_signature = None
+        self.journal_offset = 0
+        if not os.path.exists(self.journal_path):
+            return None, []
+        with open(self.journal_path, 'rb+') as f:
+            f.seek(offset)
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                f.truncate(offset + end)
+                data = data[:end]
+        self.journal_signature = _file_signature(self.journal_path)
+        self.journal_offset = offset + end
+        if not data:
+            return None, []
+
+        lines = data.rstrip(b'\n')
+        try:
+            # json.dumps never emits raw newlines, so the journal can be
+            # parsed as one array in a single call
+            with _gc_paused():
+                records = json.loads(b'[' + lines.replace(b'\n', b',') + b']')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            records = []
+            for line in lines.split(b'\n'):
+                try:
+                    records.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+
+        header = None
+        if offset == 0 and records and isinstance(records[0], dict) and 'base' in records[0]:
+            header = records.pop(0)
+        return header, records
+
+    def _replace_file(self, path, write):
+        """Write a file through a temporary file and an atomic rename"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def _reset_journal(self, base, generation):
+        """Start an empty journal on top of a snapshot with base entries and the given generation"""
+        header = {'base': base}
+        if generation is not None:
+            header['generation'] = generation
+        # Replaced rather than truncated, so other processes see a new file
+        self._replace_file(self.journal_path, lambda f: f.write(_encode_compact(header) + '\n'))
+        self.journal_signature = _file_signature(self.journal_path)
+        self.journal_offset = self.journal_signature[1]
+        self.journal_records = 0
+
+    def _snapshot_generation(self):
+        """Generation of the snapshot the journal is written on top of"""
+        return self.generation if self.loaded else _snapshot_generation(self.path)
+
+    def _trim_journal(self):
+        """
+        Drop a torn last line from the journal before appending to it unloaded
+
+        A loaded vault does this while reading the journal (see _read_journal).
+        Only the end of the file is read. The lock must be held.
+        """
+        with open(self.journal_path, 'rb+') as f:
+            size = end = f.seek(0, os.SEEK_END)
+            while end:
+                start = max(0, end - STREAM_CHUNK_SIZE)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end != size:
+                f.truncate(end)
+
+    def _write_journal(self, text):
+        """Append records to the journal, the lock must be held"""
+        with open(self.journal_path, 'a') as f:
+            f.write(text)
+        self.journal_signature = _file_signature(self.journal_path)
+        self.journal_offset = self.journal_signature[1]
+
+    def append(self, entry):
+        """
+        Save one entry by appending a single journal record
+
+        Entries saved by other processes since the last read are added to
+        entries first, so the new entry always ends up last.
+
+        Args:
+            entry (dict): Password entry to save
+        """
+        with self.lock:
+            if self.loaded:
+                self._sync()
+            elif os.path.exists(self.journal_path):
+                self._trim_journal()
+            if not os.path.exists(self.journal_path):
+                self._reset_journal(len(self.entries), self._snapshot_generation())
+            self._write_journal(_encode_compact(as_dict(entry)) + '\n')
+            self.entries.append(as_record(entry))
+            self.journal_records += 1
+
+            if self.journal_records >= self.compact_every:
+                self.compact()
+
+    def rotate(self, position, entry):
+        """
+        Save a new version of an entry, keeping the current one in its history
+
+        Only one small journal record is written, naming the entry but
+        without its history. The vault is loaded first if it was not.
+
+        Args:
+            position (int): Position of the entry in entries
+            entry (dict): New version (password, notes, created_at, length, strength)
+
+        Returns:
+            VaultRecord: The rotated entry now at position
+        """
+        with self.lock:
+            if self.loaded:
+                self._sync()
+            else:
+                self.load()
+            record = self.entries[position].rotated(entry, self.history_limit)
+            if not os.path.exists(self.journal_path):
+                self._reset_journal(len(self.entries), self.generation)
+            self._write_journal(_encode_compact(_rotation_record(position, record)) + '\n')
+            self.rotated.append((position, self.entries[position]))
+            self.entries[position] = record
+            self.journal_records += 1
+
+            if self.journal_records >= self.compact_every:
+                self.compact()
+        return record
+
+    def extend(self, entries):
+        """
+        Save several entries, appending them to the journal in one write
+
+        On a vault that has not been loaded the entries are only written to
+        the journal, so streaming an import never holds the vault in memory;
+        the next load picks them up.
+
+        Args:
+            entries (list): Password entries to save
+        """
+        with self.lock:
+            if self.loaded:
+                self._sync()
+            elif os.path.exists(self.journal_path):
+                self._trim_journal()
+            if not os.path.exists(self.journal_path):
+                if self.loaded:
+                    base = len(self.entries)
+                else:
+                    base = sum(1 for _ in self.iter_entries())
+                self._reset_journal(base, self._snapshot_generation())
+            self._write_journal(''.join(_encode_compact(as_dict(entry)) + '\n' for entry in entries))
+            if self.loaded:
+                self.entries.extend(as_record(entry) for entry in entries)
+                self.journal_records += len(entries)
+                if self.journal_records >= self.compact_every:
+                    self.compact()
+
+    def compact(self):
+        """
+        Rewrite the snapshot with every entry and empty the journal
+
+        The snapshot is a JSON array of a header and then blocks of up to
+        COMPACT_WRITE_BATCH entries, each holding a list per field rather
+        than an object per entry (see _snapshot_block). That parses faster,
+        takes far less space and each block turns into records in bulk. A
+        vault that was not loaded is loaded first.
+        """
+        with self.lock:
+            if self.loaded:
+                self._sync()
+            else:
+                self.load()
+            entries = self.entries
+            generation = _new_generation()
+
+            def write(f):
+                # Written a block at a time so the text for the whole vault
+                # never exists at once
+                f.write('[' + _encode_compact({'format': SNAPSHOT_FORMAT, 'generation': generation}))
+                for start in range(0, len(entries), COMPACT_WRITE_BATCH):
+                    block = [as_record(entry) for entry in entries[start:start + COMPACT_WRITE_BATCH]]
+                    f.write(',' + _encode_compact(_snapshot_block(block)))
+                f.write(']')
+
+            self._replace_file(self.path, write)
+            self.generation = generation
+            self.snapshot_signature = _file_signature(self.path)
+            self._reset_journal(len(entries), generation)
+
+
+class SQLiteVault:
+    """
+    Password vault stored in an indexed SQLite database
+
+    SQLite already makes writes from several processes safe. Changes made by
+    other connections are picked up with refresh, which asks SQLite whether
+    anything was committed and then reads only the new rows. Rotating an
+    entry updates its row in place and bumps a counter, so other connections
+    know to read the vault again.
+    """
+
+    def __init__(self, path, history_limit=DEFAULT_HISTORY_LIMIT):
+        self.path = path
+        self.history_limit = history_limit
+        self.entries = []
+        # Row id of each entry
+        self.ids = array('q')
+        self.loaded = False
+        # (position, previous record) of entries rotated since take_rotated
+        self.rotated = []
+        # Id of the last row in entries, the data version it was read at and
+        # the number of rotations seen
+        self.last_id = 0
+        self.data_version = None
+        self.rotations = 0
+        # Imported here so the JSON vault never pays for loading sqlite3
+        import sqlite3
+
+        # The GUI loads and refreshes the vault on a worker thread, so the
+        # connection is shared between threads behind a lock
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS passwords ('
+                'id INTEGER PRIMARY KEY, '
+                'website TEXT NOT NULL, '
+                'username TEXT NOT NULL, '
+                'password TEXT NOT NULL, '
+                "notes TEXT NOT NULL DEFAULT '', "
+                'created_at TEXT NOT NULL, '
+                'length INTEGER NOT NULL, '
+                'strength TEXT NOT NULL, '
+                'history TEXT)'
+            )
+            columns = {row[1] for row in self.connection.execute('PRAGMA table_info(passwords)')}
+            if 'history' not in columns:
+                # Database created before entries had a history
+                self.connection.execute('ALTER TABLE passwords ADD COLUMN history TEXT')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS vault_state (name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            self.connection.execute("INSERT OR IGNORE INTO vault_state VALUES ('rotations', 0)")
+            self.connection.execute('CREATE INDEX IF NOT EXISTS idx_passwords_website ON passwords (website)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS idx_passwords_username ON passwords (username)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS idx_passwords_created_at ON passwords (created_at)')
+
+    @staticmethod
+    def _record(row):
+        """Build a record from the entry columns and history of a row"""
+        *fields, history = row
+        return VaultRecord(*fields, history=json.loads(history) if history else None)
+
+    def _query(self, sql, params=()):
+        """Run a select over the entry and history columns and return records"""
+        rows = self.connection.execute(sql, params)
+        return [self._record(row) for row in rows]
+
+    def _rotation_count(self):
+        return self.connection.execute("SELECT value FROM vault_state WHERE name = 'rotations'").fetchone()[0]
+
+    def load(self):
+        """
+        Load every entry in insertion order
+
+        Returns:
+            list: All saved entries
+        """
+        with self.lock:
+            self.entries = []
+            self.ids = array('q')
+            self.rotated = []
+            self.last_id = 0
+            self.rotations = self._rotation_count()
+            self._read_new_rows()
+            self.loaded = True
+        return self.entries
+
+    def _read_new_rows(self):
+        """Add rows after last_id to entries, the lock must be held"""
+        self.data_version = self.connection.execute('PRAGMA data_version').fetchone()[0]
+        rows = self.connection.execute(
+            f"SELECT id, {', '.join(ENTRY_FIELDS)}, history FROM passwords WHERE id > ? ORDER BY id",
+            (self.last_id,)
+        )
+        added = 0
+        for row in rows:
+            self.entries.append(self._record(row[1:]))
+            self.ids.append(row[0])
+            self.last_id = row[0]
+            added += 1
+        return added
+
+    def _catch_up(self):
+        """
+        Read what other connections changed, the lock must be held
+
+        New rows are read on their own; after a rotation by another
+        connection the whole vault is read again, replacing entries.
+
+        Returns:
+            bool: Whether anything changed
+        """
+        if self._rotation_count() != self.rotations:
+            self.load()
+            return True
+        return bool(self._read_new_rows())
+
+    def has_changed(self):
+        """Check whether another connection committed changes since the vault was read"""
+        with self.lock:
+            return self.connection.execute('PRAGMA data_version').fetchone()[0] != self.data_version
+
+    def refresh(self):
+        """
+        Add entries saved by other connections since the vault was read
+
+        Returns:
+            bool: Whether anything changed
+        """
+        with self.lock:
+            if not self.loaded or not self.has_changed():
+                return False
+            return self._catch_up()
+
+    def take_rotated(self):
+        """
+        Get the entries this connection rotated in place since the last call
+
+        A rotation by another connection reads the whole vault again, which
+        replaces entries and starts over.
+
+        Returns:
+            list: (position, previous record) pairs, oldest rotation first
+        """
+        rotated, self.rotated = self.rotated, []
+        return rotated
+
+    def iter_entries(self):
+        """Yield every saved entry in insertion order, one row at a time"""
+        rows = self.connection.execute(f"SELECT {', '.join(ENTRY_FIELDS)}, history FROM passwords ORDER BY id")
+        for row in rows:
+            entry = dict(zip(ENTRY_FIELDS, row))
+            if row[-1]:
+                entry['history'] = json.loads(row[-1])
+            yield entry
+
+    def append(self, entry):
+        """
+        Save one entry
+
+        Args:
+            entry (dict): Password entry to save
+        """
+        self.extend([entry])
+
+    def extend(self, entries):
+        """Save several entries in a single transaction"""
+        entries = list(entries)
+        placeholders = ', '.join('?' for _ in ENTRY_FIELDS)
+        rows = ([entry.get(field, '') for field in ENTRY_FIELDS]
+                + [_encode_compact(entry['history']) if entry.get('history') else None]
+                for entry in entries)
+        with self.lock, self.connection:
+            if self.loaded:
+                # Take the write lock first, so rows other connections add
+                # can be read in before ours and none are skipped
+                self.connection.execute('BEGIN IMMEDIATE')
+                self._catch_up()
+            self.connection.executemany(
+                f"INSERT INTO passwords ({', '.join(ENTRY_FIELDS)}, history) VALUES ({placeholders}, ?)", rows
+            )
+            if self.loaded:
+                self.entries.extend(as_record(entry) for entry in entries)
+                # Ids are handed out in order while the write lock is held
+                self.ids.extend(range(self.last_id + 1, self.last_id + 1 + len(entries)))
+                self.last_id = self.connection.execute('SELECT MAX(id) FROM passwords').fetchone()[0]
+
+    def rotate(self, position, entry):
+        """
+        Save a new version of an entry, keeping the current one in its history
+
+        Args:
+            position (int): Position of the entry in entries
+            entry (dict): New version (password, notes, created_at, length, strength)
+
+        Returns:
+            VaultRecord: The rotated entry now at position
+        """
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            if self.loaded:
+                self._catch_up()
+            else:
+                self.load()
+            record = self.entries[position].rotated(entry, self.history_limit)
+            self.connection.execute(
+                'UPDATE passwords SET password = ?, notes = ?, created_at = ?, length = ?, strength = ?, '
+                'history = ? WHERE id = ?',
+                (record.password, record.notes, record.created_text(), record.length, record.strength,
+                 _encode_compact(record.history) if record.history else None, self.ids[position])
+            )
+            self.connection.execute("UPDATE vault_state SET value = value + 1 WHERE name = 'rotations'")
+            self.rotations += 1
+            self.rotated.append((position, self.entries[position]))
+            self.entries[position] = record
+        return record
+
+    def count(self):
+        """Get the number of stored entries"""
+        return self.connection.execute('SELECT COUNT(*) FROM passwords').fetchone()[0]
+
+    def find_by_website(self, website):
+        """Get all entries for a website, using the website index"""
+        return self._query(f"SELECT {', '.join(ENTRY_FIELDS)}, history FROM passwords WHERE website = ? ORDER BY id",
+                           (website,))
+
+    def find_by_username(self, username):
+        """Get all entries for a username, using the username index"""
+        return self._query(f"SELECT {', '.join(ENTRY_FIELDS)}, history FROM passwords WHERE username = ? ORDER BY id",
+                           (username,))
+
+    def recent(self, limit=20):
+        """Get the most recently created entries, newest first"""
+        return self._query(f"SELECT {', '.join(ENTRY_FIELDS)}, history FROM passwords "
+                           "ORDER BY created_at DESC, id DESC LIMIT ?", (limit,))
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
+
+
+def _set_bits(mask, limit):
+    """Positions of the set bits of an int, lowest first, at most limit of them"""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    positions = []
+    for start in range(0, len(data), BIT_SCAN_BLOCK):
+        block = data[start:start + BIT_SCAN_BLOCK]
+        if block.count(0) == len(block):
+            continue
+        bits = bin(int.from_bytes(block, 'little'))[:1:-1]
+        offset = start * 8
+        position = bits.find('1')
+        while position != -1:
+            positions.append(offset + position)
+            if len(positions) >= limit:
+                return positions
+            position = bits.find('1', position + 1)
+    return positions
+
+
+class TrigramSearchIndex:
+    """
+    Trigram index for ranked fuzzy search over saved entries
+
+    The website, username and notes of every entry are broken into
+    overlapping three-character pieces, each mapped to the positions of the
+    entries containing it. A query is broken up the same way and entries are
+    ranked by how many of its trigrams they share, so "gthub" still finds
+    "github.com".
+
+    Positions are kept in compact arrays. For searching, the trigrams being
+    used are turned into bitsets (one bit per entry, as Python ints, cached)
+    and the per-entry match counts are added up with bitwise operations, so
+    a query costs a few dozen whole-vault AND/XORs in C whatever the number
+    of matching entries.
+    """
+
+    SEARCH_FIELDS = ('website', 'username', 'notes')
+    # Share of the query's trigrams an entry needs to match
+    MIN_SIMILARITY = 0.5
+    # Memory for cached trigram bitsets
+    BITSET_CACHE_BYTES = 32 << 20
+
+    def __init__(self, entries=()):
+        self.postings = {}
+        self.bitsets = {}
+        self.size = 0
+        for entry in entries:
+            self.add(entry)
+
+    @staticmethod
+    def _trigrams(text):
+        """Lowercased trigrams of text, padded to mark where it starts and ends"""
+        padded = f"  {text.lower()} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _entry_trigrams(self, entry):
+        """Trigrams of every searched field of an entry"""
+        trigrams = set()
+        for field in self.SEARCH_FIELDS:
+            value = entry.get(field)
+            if value:
+                trigrams.update(self._trigrams(value))
+        return trigrams
+
+    def add(self, entry):
+        """Index an entry appended to the end of the vault"""
+        trigrams = self._entry_trigrams(entry)
+        position = self.size
+        postings = self.postings
+        bitsets = self.bitsets
+        for trigram in trigrams:
+            posting = postings.get(trigram)
+            if posting is None:
+                postings[trigram] = array('I', (position,))
+            else:
+                posting.append(position)
+            if trigram in bitsets:
+                bitsets[trigram] |= 1 << position
+        self.size += 1
+
+    def update(self, position, old_entry, entry):
+        """
+        Re-index an entry replaced in place, e.g. by a rotation
+
+        Only the trigrams the two versions do not share are touched.
+
+        Args:
+            position (int): Position of the entry
+            old_entry (dict): Version that was indexed
+            entry (dict): Version now at position
+        """
+        old = self._entry_trigrams(old_entry)
+        new = self._entry_trigrams(entry)
+        bit = 1 << position
+        for trigram in old - new:
+            posting = self.postings.get(trigram)
+            if posting is None or position not in posting:
+                continue
+            posting.remove(position)
+            if not posting:
+                del self.postings[trigram]
+                self.bitsets.pop(trigram, None)
+            elif trigram in self.bitsets:
+                self.bitsets[trigram] &= ~bit
+        for trigram in new - old:
+            posting = self.postings.get(trigram)
+            if posting is None:
+                self.postings[trigram] = array('I', (position,))
+            elif position not in posting:
+                bisect.insort(posting, position)
+            if trigram in self.bitsets:
+                self.bitsets[trigram] |= bit
+
+    def _bitset(self, trigram):
+        """Get the bitset of entries containing a trigram, building it on first use"""
+        bits = self.bitsets.get(trigram)
+        if bits is None:
+            bitmap = bytearray((self.size + 7) // 8)
+            for position in self.postings[trigram]:
+                bitmap[position >> 3] |= 1 << (position & 7)
+            bits = int.from_bytes(bitmap, 'little')
+            if len(self.bitsets) >= max(16, self.BITSET_CACHE_BYTES // max(len(bitmap), 1)):
+                # Drop the oldest cached bitset
+                del self.bitsets[next(iter(self.bitsets))]
+            self.bitsets[trigram] = bits
+        return bits
+
+    def search(self, query, limit=None):
+        """
+        Find entries resembling query, best matches first
+
+        Args:
+            query (str): Text to look for, empty matches everything
+            limit (int): Maximum number of results, None for all
+
+        Returns:
+            Sequence of int: Positions of matching entries, ranked by the
+            number of shared trigrams and then in vault order
+        """
+        query = query.strip()
+        if not query:
+            return range(self.size if limit is None else min(limit, self.size))
+        if limit is None:
+            limit = self.size
+
+        trigrams = self._trigrams(query)
+        present = [trigram for trigram in trigrams if trigram in self.postings]
+        needed = max(1, math.ceil(len(trigrams) * self.MIN_SIMILARITY))
+        if len(present) < needed:
+            return []
+
+        # counters[i] holds bit i of every entry's match count
+        counters = []
+        for trigram in present:
+            carry = self._bitset(trigram)
+            for i, counter in enumerate(counters):
+                counters[i], carry = counter ^ carry, counter & carry
+                if not carry:
+                    break
+            if carry:
+                counters.append(carry)
+
+        everything = (1 << self.size) - 1
+        inverted = [everything ^ counter for counter in counters]
+        results = []
+        # Counts above what the counters can hold would need bits that are
+        # never checked, so no entry reaches them
+        for count in range(min(len(present), (1 << len(counters)) - 1), needed - 1, -1):
+            mask = everything
+            for i, counter in enumerate(counters):
+                mask &= counter if count >> i & 1 else inverted[i]
+                if not mask:
+                    break
+            if mask:
+                results.extend(_set_bits(mask, limit - len(results)))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class PasswordReuseIndex:
+    """
+    Keyed-hash index from passwords to the entries that use them
+
+    Passwords are stored as keyed BLAKE2 digests under a random per-process
+    key, so the index itself holds no plaintext. Lookups are a single dict
+    access and the index is kept up to date as entries are saved.
+    """
+
+    def __init__(self, entries=()):
+        self.key = os.urandom(32)
+        self.positions = {}
+        self.size = 0
+        for entry in entries:
+            self.add(entry)
+
+    def _digest(self, password):
+        return hashlib.blake2b(password.encode('utf-8'), key=self.key, digest_size=16).digest()
+
+    def add(self, entry):
+        """Index an entry appended to the end of the vault"""
+        self.positions.setdefault(self._digest(entry['password']), []).append(self.size)
+        self.size += 1
+
+    def find(self, password):
+        """Get the positions of every entry using password"""
+        return list(self.positions.get(self._digest(password), ()))
+
+    def update(self, position, old_password, password):
+        """Re-index an entry whose password was rotated"""
+        old_digest = self._digest(old_password)
+        positions = self.positions.get(old_digest)
+        if positions is not None and position in positions:
+            positions.remove(position)
+            if not positions:
+                del self.positions[old_digest]
+        positions = self.positions.setdefault(self._digest(password), [])
+        if position not in positions:
+            bisect.insort(positions, position)
+
+    def duplicates(self):
+        """
+        Get every group of entries sharing a password
+
+        Returns:
+            list: Lists of entry positions, one list per reused password
+        """
+        return [positions for positions in self.positions.values() if len(positions) > 1]
+
+
+class CredentialIndex:
+    """
+    Index from a website and username to the entry holding its current password
+
+    Saving a password for a credential that is already in the vault rotates
+    that entry, so this is looked up on every save. Vaults saved before
+    entries were rotated can hold several entries for one credential; the
+    newest one is the current one.
+    """
+
+    def __init__(self, entries=()):
+        self.positions = {}
+        self.size = 0
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        """Index an entry appended to the end of the vault"""
+        self.positions[entry['website'], entry['username']] = self.size
+        self.size += 1
+
+    def find(self, website, username):
+        """Get the position of the current entry for a credential, or None"""
+        return self.positions.get((website, username))
+
+
+def open_vault(path):
+    """
+    Open the vault for a storage path
+
+    A path ending in .db opens the SQLite backend directly. For the JSON
+    vault, a migrated database next to it (same name, .db extension) is
+    preferred over the JSON files.
+
+    Args:
+        path (str): Path of the JSON or SQLite vault
+
+    Returns:
+        JournalVault or SQLiteVault: Vault, not loaded yet
+    """
+    if path.endswith(SQLITE_SUFFIX):
+        return SQLiteVault(path)
+    db_path = os.path.splitext(path)[0] + SQLITE_SUFFIX
+    if os.path.exists(db_path):
+        return SQLiteVault(db_path)
+    return JournalVault(path)
+
+
+def migrate_json_to_sqlite(json_path, db_path=None):
+    """
+    Copy a JSON vault (snapshot and journal) into a new SQLite vault
+
+    Args:
+        json_path (str): Path of the JSON vault
+        db_path (str): Path of the database, defaults to json_path with .db
+
+    Returns:
+        int: Number of migrated entries
+    """
+    if db_path is None:
+        db_path = os.path.splitext(json_path)[0] + SQLITE_SUFFIX
+    entries = JournalVault(json_path).load()
+
+    vault = SQLiteVault(db_path)
+    try:
+        if vault.count():
+            raise ValueError(f"{db_path} already contains saved passwords")
+        vault.extend(entries)
+    finally:
+        vault.close()
+    return len(entries)
+
+
+def downgrade_vault(path):
+    """
+    Rewrite a JSON vault in the format older versions of the app read
+
+    Those expect the snapshot to be a plain JSON array of entry objects
+    (written with indent=2) and know nothing of the journal. Every entry,
+    with the journal folded in, is streamed into such a snapshot and the
+    journal is removed. The next compaction by this version writes blocks
+    again.
+
+    Args:
+        path (str): Path of the JSON vault
+
+    Returns:
+        int: Number of entries written
+    """
+    vault = JournalVault(path)
+    count = 0
+
+    def write(f):
+        nonlocal count
+        # Same text as json.dump(entries, f, indent=2), one entry at a time
+        f.write('[')
+        for entry in vault.iter_entries():
+            f.write((',\n  ' if count else '\n  ') + json.dumps(entry, indent=2).replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else ']')
+
+    try:
+        with vault.lock:
+            vault._replace_file(path, write)
+            if os.path.exists(vault.journal_path):
+                os.remove(vault.journal_path)
+    finally:
+        vault.lock.close()
+    return count
+
+
+def _format_for(path, fmt=None):
+    """Get the export format for a file, from its extension unless given"""
+    if fmt is None:
+        fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+def export_vault(vault, output, fmt='jsonl'):
+    """
+    Stream every entry of a vault to a JSON Lines or CSV file
+
+    Args:
+        vault (JournalVault or SQLiteVault): Vault to export, need not be loaded
+        output (file): Text file to write to (opened with newline='' for CSV)
+        fmt (str): 'jsonl' or 'csv'
+
+    Returns:
+        int: Number of exported entries
+    """
+    count = 0
+    if fmt == 'csv':
+        import csv
+
+        writer = csv.DictWriter(output, fieldnames=ENTRY_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for entry in vault.iter_entries():
+            writer.writerow(entry)
+            count += 1
+    else:
+        for entry in vault.iter_entries():
+            output.write(_encode_compact(entry) + '\n')
+            count += 1
+    return count
+
+
+def iter_import_file(source, fmt='jsonl'):
+    """
+    Yield the entries in a JSON Lines or CSV export, one at a time
+
+    Missing optional fields are filled in (length from the password, strength
+    from the estimator, created_at with the current time). Records without a
+    website, username or password are skipped.
+
+    Args:
+        source (file): Text file to read (opened with newline='' for CSV)
+        fmt (str): 'jsonl' or 'csv'
+    """
+    if fmt == 'csv':
+        import csv
+
+        records = csv.DictReader(source)
+    else:
+        records = (json.loads(line) for line in source if line.strip())
+
+    for record in records:
+        if not isinstance(record, dict) or not all(record.get(field) for field in ('website', 'username', 'password')):
+            continue
+        entry = {field: record.get(field) or '' for field in ENTRY_FIELDS}
+        try:
+            entry['length'] = int(entry['length'])
+        except ValueError:
+            entry['length'] = len(entry['password'])
+        if not entry['strength']:
+            from strength_estimator import estimate_strength, strength_label
+            entry['strength'] = strength_label(estimate_strength(entry['password']).bits)
+        if not entry['created_at']:
+            entry['created_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(record.get('history'), list):
+            # Only JSON Lines exports carry previous versions
+            entry['history'] = record['history']
+        yield entry
+
+
+def import_entries(vault, entries, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Save entries into a vault, skipping ones it already has
+
+    An entry is a duplicate when its website, username and password match an
+    entry in the vault or earlier in the import. Existing entries are indexed
+    once by a keyed hash of those fields (no plaintext is kept), so each
+    check is a set lookup. Entries are written in batches.
+
+    Args:
+        vault (JournalVault or SQLiteVault): Vault to import into
+        entries (iterable): Entries to import, e.g. from iter_import_file
+        batch_size (int): Entries saved per write
+
+    Returns:
+        tuple: (imported, skipped) entry counts
+    """
+    key = os.urandom(32)
+
+    def digest(entry):
+        identity = '\0'.join((entry['website'], entry['username'], entry['password']))
+        return hashlib.blake2b(identity.encode('utf-8'), key=key, digest_size=16).digest()
+
+    seen = {digest(entry) for entry in vault.iter_entries()}
+    imported = skipped = 0
+    batch = []
+    for entry in entries:
+        entry_digest = digest(entry)
+        if entry_digest in seen:
+            skipped += 1
+            continue
+        seen.add(entry_digest)
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            vault.extend(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        vault.extend(batch)
+        imported += len(batch)
+    return imported, skipped
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the saved passwords vault")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help="Copy the JSON vault into an SQLite database")
+    migrate_parser.add_argument('json_path', nargs='?', default='saved_passwords.json')
+    migrate_parser.add_argument('db_path', nargs='?')
+
+    duplicates_parser = subparsers.add_parser('duplicates', help="Report passwords used by more than one entry")
+    duplicates_parser.add_argument('path', nargs='?', default='saved_passwords.json')
+
+    history_parser = subparsers.add_parser('history', help="Show every saved version of a website's passwords")
+    history_parser.add_argument('website')
+    history_parser.add_argument('path', nargs='?', default='saved_passwords.json')
+    history_parser.add_argument('--username', help="Only show this username")
+
+    downgrade_parser = subparsers.add_parser('downgrade', help="Rewrite the JSON vault in the format older versions read")
+    downgrade_parser.add_argument('path', nargs='?', default='saved_passwords.json')
+
+    export_parser = subparsers.add_parser('export', help="Stream saved passwords to a JSON Lines or CSV file")
+    export_parser.add_argument('output', help="File to write, - for stdout")
+    export_parser.add_argument('path', nargs='?', default='saved_passwords.json')
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS,
+                               help="Output format (default: from the file extension, else jsonl)")
+
+    import_parser = subparsers.add_parser('import', help="Add entries from a JSON Lines or CSV file, skipping duplicates")
+    import_parser.add_argument('input', help="File to read, - for stdin")
+    import_parser.add_argument('path', nargs='?', default='saved_passwords.json')
+    import_parser.add_argument('--format', choices=EXPORT_FORMATS,
+                               help="Input format (default: from the file extension, else jsonl)")
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        vault = open_vault(args.path)
+        fmt = _format_for(args.output, args.format)
+        try:
+            if args.output == '-':
+                count = export_vault(vault, sys.stdout, fmt)
+            else:
+                with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                    count = export_vault(vault, f, fmt)
+        except ValueError as e:
+            parser.exit(1, f"Error: could not read {args.path}: {e}\n")
+        print(f"Exported {count} saved passwords", file=sys.stderr)
+    elif args.command == 'import':
+        vault = open_vault(args.path)
+        fmt = _format_for(args.input, args.format)
+        try:
+            if args.input == '-':
+                imported, skipped = import_entries(vault, iter_import_file(sys.stdin, fmt))
+            else:
+                with open(args.input, 'r', encoding='utf-8', newline='') as f:
+                    imported, skipped = import_entries(vault, iter_import_file(f, fmt))
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"Error: {e}\n")
+        print(f"Imported {imported} saved passwords, skipped {skipped} duplicates")
+    elif args.command == 'duplicates':
+        entries = open_vault(args.path).load()
+        groups = PasswordReuseIndex(entries).duplicates()
+        for positions in groups:
+            sites = ', '.join(f"{entries[p]['website']} ({entries[p]['username']})" for p in positions)
+            print(f"Reused {len(positions)} times: {sites}")
+        print(f"{len(groups)} reused passwords")
+    elif args.command == 'history':
+        found = 0
+        for entry in open_vault(args.path).iter_entries():
+            if entry['website'] != args.website or args.username not in (None, entry['username']):
+                continue
+            found += 1
+            print(f"{entry['website']} ({entry['username']})")
+            for version in VaultRecord.from_dict(entry).versions():
+                print(f"  {version['created_at']}  {version['password']}  {version['strength']}")
+        if not found:
+            parser.exit(1, f"No saved passwords for {args.website}\n")
+    elif args.command == 'downgrade':
+        try:
+            count = downgrade_vault(args.path)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"Error: {e}\n")
+        print(f"Rewrote {count} saved passwords in the original format")
+    elif args.command == 'migrate':
+        try:
+            count = migrate_json_to_sqlite(args.json_path, args.db_path)
+        except ValueError as e:
+            parser.exit(1, f"Error: {e}\n")
+        print(f"Migrated {count} saved passwords")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# pwgen.py
+"""
+Command-line password generator.
+
+Streams passwords to stdout without a display and without importing tkinter,
+using the same options as the GUI. Large batches are generated in chunks and
+can be spread over several processes:
+
+    python pwgen.py -l 24 -n 100000 --no-symbols > passwords.txt
+    python pwgen.py -n 10000000 --workers 4 | ...
+    python pwgen.py --passphrase 6 --wordlist eff_large_wordlist.txt
+    python pwgen.py --template 'Aaaa-9999-!!' -n 100
+"""
+import argparse
+import os
+import sys
+
+from passphrase import CAPITALIZE_MODES, DEFAULT_WORDLIST, Wordlist, generate_passphrase, passphrase_entropy
+from password_engine import compile_policy, compile_template, generate_batch, generate_from_template, password_entropy
+
+DEFAULT_LENGTH = 16
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def policy_options(args):
+    """Get the compile_policy arguments for parsed command-line options"""
+    return (args.uppercase, args.lowercase, args.numbers, args.symbols,
+            args.no_similar, args.no_ambiguous, args.require_all, args.exclude)
+
+
+def generate_chunk(options, length, count, template=None):
+    """
+    Generate one chunk of passwords as newline-terminated text
+
+    Module-level so it can run in worker processes.
+    """
+    if template is not None:
+        no_similar, no_ambiguous, exclude = options[4], options[5], options[7]
+        passwords = generate_from_template(compile_template(template, no_similar, no_ambiguous, exclude), count)
+    else:
+        passwords = generate_batch(compile_policy(*options), length, count)
+    return '\n'.join(passwords) + '\n' if passwords else ''
+
+
+def chunk_sizes(count, chunk_size):
+    """Split count into chunks of at most chunk_size"""
+    while count > 0:
+        yield min(count, chunk_size)
+        count -= chunk_size
+
+
+def iter_chunks(options, length, count, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, template=None):
+    """
+    Yield generated passwords as text chunks, in order
+
+    With more than one worker, chunks are generated in a process pool with
+    a bounded number in flight, so memory stays flat for any count.
+    """
+    if workers <= 1:
+        for size in chunk_sizes(count, chunk_size):
+            yield generate_chunk(options, length, size, template)
+        return
+
+    # Only pay for importing the process pool machinery when it is used
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for size in chunk_sizes(count, chunk_size):
+            pending.append(executor.submit(generate_chunk, options, length, size, template))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate passwords and stream them to stdout")
+    parser.add_argument('-l', '--length', type=int, default=DEFAULT_LENGTH,
+                        help="Password length (default: %(default)s)")
+    parser.add_argument('-n', '--count', type=int, default=1,
+                        help="Number of passwords to generate (default: %(default)s)")
+    parser.add_argument('--uppercase', action=argparse.BooleanOptionalAction, default=True,
+                        help="Include uppercase letters (A-Z)")
+    parser.add_argument('--lowercase', action=argparse.BooleanOptionalAction, default=True,
+                        help="Include lowercase letters (a-z)")
+    parser.add_argument('--numbers', action=argparse.BooleanOptionalAction, default=True,
+                        help="Include numbers (0-9)")
+    parser.add_argument('--symbols', action=argparse.BooleanOptionalAction, default=True,
+                        help="Include symbols (!@#$%%)")
+    parser.add_argument('--exclude', default='',
+                        help="Specific characters to exclude")
+    parser.add_argument('--no-similar', dest='no_similar', action='store_true', default=True,
+                        help="Exclude similar characters (i, l, 1, L, o, 0, O), the default")
+    parser.add_argument('--allow-similar', dest='no_similar', action='store_false',
+                        help="Allow similar characters")
+    parser.add_argument('--no-ambiguous', action='store_true',
+                        help="Exclude ambiguous characters ({ } [ ] ( ) / \\ ' \" ` ~)")
+    parser.add_argument('--require-all', action=argparse.BooleanOptionalAction, default=True,
+                        help="Include at least one character of every selected type")
+    parser.add_argument('--template',
+                        help="Generate passwords following a template like 'Aaaa-9999-!!' "
+                             "(A upper, a lower, 9 digit, ! symbol, * any), ignoring length and types")
+    parser.add_argument('--entropy', action='store_true',
+                        help="Report the exact entropy per password on stderr")
+
+    passphrase_group = parser.add_argument_group("passphrase mode")
+    passphrase_group.add_argument('--passphrase', type=int, metavar='WORDS',
+                                  help="Generate passphrases of this many words instead")
+    passphrase_group.add_argument('--wordlist', default=DEFAULT_WORDLIST,
+                                  help="Wordlist with one word per line (default: %(default)s)")
+    passphrase_group.add_argument('--separator', default='-',
+                                  help="Text between words (default: %(default)s)")
+    passphrase_group.add_argument('--capitalize', choices=CAPITALIZE_MODES, default='none',
+                                  help="Capitalize no words, all words or each word at random")
+    passphrase_group.add_argument('--digit', action='store_true',
+                                  help="Append a random digit to a random word")
+
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes to generate with (0 for one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Passwords generated per chunk (default: %(default)s)")
+    return parser
+
+
+def write_passphrases(parser, args, out):
+    """Stream passphrases, one per line"""
+    try:
+        wordlist = Wordlist(args.wordlist)
+    except (OSError, ValueError) as e:
+        parser.error(f"could not open wordlist: {e}")
+    try:
+        if args.entropy:
+            bits = passphrase_entropy(len(wordlist), args.passphrase, args.capitalize, args.digit)
+            print(f"Entropy: {bits:.1f} bits per passphrase ({len(wordlist)} words)", file=sys.stderr)
+        for _ in range(args.count):
+            out.write(generate_passphrase(wordlist, args.passphrase, args.separator,
+                                          args.capitalize, args.digit) + '\n')
+    finally:
+        wordlist.close()
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.count < 0:
+        parser.error("count must not be negative")
+    if args.passphrase is not None and args.passphrase < 1:
+        parser.error("a passphrase needs at least one word")
+    if args.chunk_size < 1:
+        parser.error("chunk size must be at least 1")
+    workers = args.workers or os.cpu_count() or 1
+
+    options = policy_options(args)
+    template = None
+    if args.template is not None and args.passphrase is None:
+        try:
+            template = compile_template(args.template, args.no_similar, args.no_ambiguous, args.exclude)
+        except ValueError as e:
+            parser.error(f"invalid template: {e}")
+    elif args.passphrase is None:
+        try:
+            # Validate the options once before streaming anything
+            generate_batch(compile_policy(*options), args.length, 0)
+        except ValueError as e:
+            parser.error(str(e))
+
+    out = sys.stdout
+    try:
+        if args.passphrase is not None:
+            write_passphrases(parser, args, out)
+        else:
+            if args.entropy:
+                if template is not None:
+                    bits = template.entropy()
+                else:
+                    bits = password_entropy(compile_policy(*options), args.length)
+                print(f"Entropy: {bits:.1f} bits per password", file=sys.stderr)
+            for chunk in iter_chunks(options, args.length, args.count, args.chunk_size, workers, args.template):
+                out.write(chunk)
+        out.flush()
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head); stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, out.fileno())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
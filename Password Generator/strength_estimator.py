@@ -0,0 +1,327 @@
+# strength_estimator.py
+"""
+Pattern-aware password strength estimation.
+
+Instead of counting character classes, the password is broken into the
+cheapest sequence of patterns an attacker would try: dictionary words (with
+capitalisation and common l33t substitutions), repeats, sequences such as
+"abc" or "9876", keyboard walks such as "qwerty" and, for everything else,
+brute force over the character classes in use. A dynamic-programming search
+picks the split with the fewest total guesses, and the estimate is reported
+as guesses and entropy in bits.
+
+Results are memoized per password (and per repeated base token), so running
+the estimator on every keystroke or over a whole vault stays cheap.
+"""
+import functools
+import math
+import re
+from collections import namedtuple
+
+StrengthEstimate = namedtuple('StrengthEstimate', ['guesses', 'bits', 'matches'])
+Match = namedtuple('Match', ['start', 'end', 'pattern', 'token', 'guesses'])
+
+MIN_TOKEN_LENGTH = 3
+MAX_WORD_LENGTH = 24
+MIN_MATCH_GUESSES = 50
+
+# Most common passwords and password words, most frequent first
+COMMON_WORDS = """
+password 123456 qwerty abc123 letmein monkey dragon 111111 baseball iloveyou
+trustno1 sunshine master welcome shadow ashley football jesus michael ninja
+mustang password1 admin login princess solo starwars whatever freedom hello
+charlie donald secret summer winter spring autumn flower batman superman
+computer internet access love lovely pass test guest root user default
+changeme qazwsx zaq1zaq1 hunter killer soccer hockey tigger pepper cheese
+george jordan harley ranger buster thomas robert daniel andrew joshua matthew
+jennifer jessica amanda michelle hannah maggie ginger banana orange apple
+chocolate cookie coffee purple silver golden diamond angel heaven family
+friend friends happy smile money school google facebook twitter github
+linkedin yahoo amazon microsoft apple samsung samsung london paris berlin
+america canada india china soccer tennis player gamer games matrix hacker
+pokemon minecraft naruto loveme forever always secure security private
+office house home garden summer2024 welcome1 password123 admin123 root123
+""".split()
+
+# Minimum entropy in bits for each strength label, strongest first
+STRENGTH_LEVELS = (
+    (80, "Very Strong 🔒"),
+    (60, "Strong 🔐"),
+    (40, "Good 🛡️"),
+    (25, "Weak ⚠️"),
+    (0, "Very Weak 🚨"),
+)
+
+SEQUENCES = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+L33T_TABLE = str.maketrans({
+    '@': 'a', '4': 'a', '8': 'b', '(': 'c', '3': 'e', '6': 'g', '1': 'i',
+    '!': 'i', '|': 'l', '0': 'o', '$': 's', '5': 's', '7': 't', '+': 't', '2': 'z',
+})
+
+KEYBOARD_ROWS = (
+    ('`1234567890-=', '~!@#$%^&*()_+'),
+    ('qwertyuiop[]\\', 'QWERTYUIOP{}|'),
+    ("asdfghjkl;'", 'ASDFGHJKL:"'),
+    ('zxcvbnm,./', 'ZXCVBNM<>?'),
+)
+
+_word_ranks = {}
+_reversed_ranks = {}
+# Every prefix of a dictionary word (forwards or reversed), so matching can
+# stop extending a token as soon as no word could start with it
+_word_prefixes = set()
+# Longest dictionary word, kept in a list so add_words can update it
+_longest_word = [MIN_TOKEN_LENGTH]
+
+
+def add_words(words):
+    """
+    Add words to the dictionary matcher, ranked after the existing ones
+
+    Args:
+        words (iterable): Words ordered from most to least common
+    """
+    for word in words:
+        word = word.strip().lower()
+        if MIN_TOKEN_LENGTH <= len(word) <= MAX_WORD_LENGTH and word not in _word_ranks:
+            rank = len(_word_ranks) + 1
+            _word_ranks[word] = rank
+            _reversed_ranks.setdefault(word[::-1], rank)
+            for end in range(1, len(word) + 1):
+                _word_prefixes.add(word[:end])
+                _word_prefixes.add(word[::-1][:end])
+            _longest_word[0] = max(_longest_word[0], len(word))
+    estimate_strength.cache_clear()
+
+
+def load_wordlist(path):
+    """Add a frequency-ordered wordlist file (one word per line) to the dictionary"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        add_words(f)
+
+
+def _build_keyboard():
+    """Map every key to its (row, column) and whether it needs shift"""
+    positions = {}
+    for row, (plain, shifted) in enumerate(KEYBOARD_ROWS):
+        for column, char in enumerate(plain):
+            positions[char] = (row, column, False)
+        for column, char in enumerate(shifted):
+            positions[char] = (row, column, True)
+    return positions
+
+
+KEYBOARD = _build_keyboard()
+# On a staggered keyboard each key touches up to six others
+KEYBOARD_DEGREE = 6
+KEYBOARD_STARTS = len(KEYBOARD)
+
+
+def _keyboard_direction(first, second):
+    """Get the direction between two adjacent keys, or None if not adjacent"""
+    if first not in KEYBOARD or second not in KEYBOARD:
+        return None
+    row_a, column_a, _ = KEYBOARD[first]
+    row_b, column_b, _ = KEYBOARD[second]
+    direction = (row_b - row_a, column_b - column_a)
+    if direction in ((0, 1), (0, -1), (-1, 0), (-1, 1), (1, -1), (1, 0)):
+        return direction
+    return None
+
+
+def _case_variations(token):
+    """Number of capitalisation variants an attacker would try for a word"""
+    if token.islower() or not any(char.isalpha() for char in token):
+        return 1
+    if token[0].isupper() and token[1:].islower() or token.isupper() \
+            or token[-1].isupper() and token[:-1].islower():
+        return 2
+    upper = sum(1 for char in token if char.isupper())
+    lower = sum(1 for char in token if char.islower())
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _cardinality(password):
+    """Size of the character pool covering the classes used in password"""
+    pool = 0
+    if any(char.islower() for char in password):
+        pool += 26
+    if any(char.isupper() for char in password):
+        pool += 26
+    if any(char.isdigit() for char in password):
+        pool += 10
+    if any(not char.isalnum() for char in password):
+        pool += 33
+    return max(pool, 10)
+
+
+def _dictionary_matches(password):
+    """Find dictionary words, plain, reversed and with l33t substitutions"""
+    matches = []
+    lowered = password.lower()
+    unleeted = lowered.translate(L33T_TABLE)
+    length = len(password)
+    for start in range(length - MIN_TOKEN_LENGTH + 1):
+        for end in range(start + 1, min(length, start + _longest_word[0]) + 1):
+            word = lowered[start:end]
+            plain = unleeted[start:end]
+            # Stop extending once no dictionary word starts like this
+            if word not in _word_prefixes and plain not in _word_prefixes:
+                break
+            if end - start < MIN_TOKEN_LENGTH:
+                continue
+            token = password[start:end]
+            if word in _word_ranks:
+                matches.append(Match(start, end, 'dictionary', token,
+                                     _word_ranks[word] * _case_variations(token)))
+            elif word in _reversed_ranks:
+                matches.append(Match(start, end, 'dictionary', token,
+                                     _reversed_ranks[word] * _case_variations(token) * 2))
+            elif plain != word and plain in _word_ranks:
+                substitutions = sum(1 for a, b in zip(word, plain) if a != b)
+                matches.append(Match(start, end, 'l33t', token,
+                                     _word_ranks[plain] * _case_variations(token) * 2 ** substitutions))
+    return matches
+
+
+def _repeat_matches(password):
+    """Find runs of a repeated character or repeated block"""
+    matches = []
+    for found in re.finditer(r'(.+?)\1+', password):
+        base = found.group(1)
+        repeats = len(found.group(0)) // len(base)
+        if len(found.group(0)) < MIN_TOKEN_LENGTH:
+            continue
+        base_guesses = estimate_strength(base).guesses if len(base) > 1 else _cardinality(base)
+        matches.append(Match(found.start(), found.end(), 'repeat', found.group(0), base_guesses * repeats))
+    return matches
+
+
+def _sequence_matches(password):
+    """Find alphabetical or numeric runs like 'abc', '2468' or 'zyx'"""
+    matches = []
+    length = len(password)
+    lowered = password.lower()
+    start = 0
+    while start < length - 1:
+        delta = ord(lowered[start + 1]) - ord(lowered[start])
+        end = start + 1
+        if 0 < abs(delta) <= 5:
+            while end + 1 < length and ord(lowered[end + 1]) - ord(lowered[end]) == delta:
+                end += 1
+        token = password[start:end + 1]
+        if end - start + 1 >= MIN_TOKEN_LENGTH and all(char in SEQUENCES for char in token.lower()):
+            first = lowered[start]
+            if first in 'a1z9':
+                base = 4
+            elif first.isdigit():
+                base = 10
+            else:
+                base = 26 * _case_variations(token)
+            if delta < 0:
+                base *= 2
+            matches.append(Match(start, end + 1, 'sequence', token, base * len(token) * abs(delta)))
+            start = end
+        else:
+            start += 1
+    return matches
+
+
+def _keyboard_guesses(length, turns, shifted):
+    """Guesses for a keyboard walk of a given length and number of turns"""
+    guesses = 0
+    for walk in range(2, length + 1):
+        for turn in range(1, min(turns, walk - 1) + 1):
+            guesses += math.comb(walk - 1, turn - 1) * KEYBOARD_STARTS * KEYBOARD_DEGREE ** turn
+    if shifted:
+        plain = length - shifted
+        guesses *= sum(math.comb(length, i) for i in range(1, min(shifted, plain) + 1)) if plain else 2
+    return guesses
+
+
+def _keyboard_matches(password):
+    """Find walks along adjacent keys, like 'qwerty' or 'zxcvb'"""
+    matches = []
+    length = len(password)
+    start = 0
+    while start < length - 1:
+        end = start
+        turns = 0
+        last_direction = None
+        while end + 1 < length:
+            direction = _keyboard_direction(password[end], password[end + 1])
+            if direction is None:
+                break
+            if direction != last_direction:
+                turns += 1
+                last_direction = direction
+            end += 1
+        if end - start + 1 >= MIN_TOKEN_LENGTH:
+            token = password[start:end + 1]
+            shifted = sum(1 for char in token if KEYBOARD[char][2])
+            matches.append(Match(start, end + 1, 'keyboard', token,
+                                 _keyboard_guesses(len(token), turns, shifted)))
+            start = end
+        else:
+            start += 1
+    return matches
+
+
+@functools.lru_cache(maxsize=8192)
+def estimate_strength(password):
+    """
+    Estimate how many guesses it takes to crack a password
+
+    Args:
+        password (str): Password to estimate
+
+    Returns:
+        StrengthEstimate: Guesses, entropy in bits and the matched patterns
+    """
+    if not password:
+        return StrengthEstimate(1, 0.0, ())
+
+    length = len(password)
+    cardinality = _cardinality(password)
+    ending_at = [[] for _ in range(length + 1)]
+    for matcher in (_dictionary_matches, _repeat_matches, _sequence_matches, _keyboard_matches):
+        for match in matcher(password):
+            ending_at[match.end].append(match)
+
+    # best[i] is the fewest guesses for password[:i], with the match used
+    best = [1] + [None] * length
+    used = [None] * (length + 1)
+    for end in range(1, length + 1):
+        best[end] = best[end - 1] * cardinality
+        used[end] = None
+        for match in ending_at[end]:
+            guesses = best[match.start] * max(match.guesses, MIN_MATCH_GUESSES)
+            if guesses < best[end]:
+                best[end] = guesses
+                used[end] = match
+
+    matches = []
+    position = length
+    while position > 0:
+        match = used[position]
+        if match is None:
+            position -= 1
+        else:
+            matches.append(match)
+            position = match.start
+    matches.reverse()
+
+    guesses = best[length]
+    return StrengthEstimate(guesses, math.log2(guesses), tuple(matches))
+
+
+def strength_label(bits):
+    """Get the strength label for an entropy estimate in bits"""
+    for minimum, label in STRENGTH_LEVELS:
+        if bits >= minimum:
+            return label
+    return STRENGTH_LEVELS[-1][1]
+
+
+add_words(COMMON_WORDS)
@@ -0,0 +1,73 @@
+# test_breach_filter.py
+"""
+Tests for the breached password filter: building and checking a filter,
+and refusing files that are not filters without leaving them open.
+
+Run with "python -m pytest" or "python -m unittest" from this directory.
+"""
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from breach_filter import HEADER, MAGIC, BreachFilter, build_breach_filter, load_breach_filter
+
+
+class BreachFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'breached_passwords.bloom')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_built_filter_finds_every_password(self):
+        wordlist = os.path.join(self.directory, 'breached.txt')
+        passwords = [f'password{i}' for i in range(500)]
+        with open(wordlist, 'w') as f:
+            f.write('\n'.join(passwords) + '\n\n')
+
+        self.assertEqual(build_breach_filter(wordlist, self.path, 0.01), 500)
+        breach_filter = BreachFilter(self.path)
+        try:
+            for password in passwords:
+                self.assertIn(password, breach_filter)
+            false_positives = sum(f'unbreached{i}' in breach_filter for i in range(2000))
+            # Far above the expected 20 at a 1% rate
+            self.assertLess(false_positives, 60)
+        finally:
+            breach_filter.close()
+
+    def test_missing_filter(self):
+        self.assertIsNone(load_breach_filter(self.path))
+
+    def test_invalid_files_are_closed(self):
+        invalid = {
+            'empty': b'',
+            'shorter than a header': MAGIC[:5],
+            'wrong magic': HEADER.pack(b'NOTBLOOM', 64, 3) + bytes(8),
+            'no bits': HEADER.pack(MAGIC, 0, 3),
+            'no hashes': HEADER.pack(MAGIC, 64, 0) + bytes(8),
+            'truncated bits': HEADER.pack(MAGIC, 640, 3) + bytes(8),
+        }
+        for name, data in invalid.items():
+            with self.subTest(name):
+                self.write(data)
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter('always', ResourceWarning)
+                    with self.assertRaises(ValueError):
+                        BreachFilter(self.path)
+                    self.assertIsNone(load_breach_filter(self.path))
+                    gc.collect()
+                self.assertEqual([w for w in caught if issubclass(w.category, ResourceWarning)], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+# test_engine.py
+"""
+Tests for the password generation engine.
+
+Run with "python -m pytest" or "python -m unittest" from this directory.
+"""
+import collections
+import itertools
+import math
+import unittest
+
+from password_engine import (
+    DIGITS, LOWERCASE, SIMILAR_CHARS, SYMBOLS, UPPERCASE, compile_policy, compile_template, generate_batch,
+    generate_from_template, seed_random,
+)
+
+
+def small_policy(upper, lower, digits):
+    """Require-all policy over just the given uppercase, lowercase and digit characters"""
+    exclude = ''.join(char for char in UPPERCASE + LOWERCASE + DIGITS if char not in upper + lower + digits)
+    return compile_policy(True, True, True, False, False, False, True, exclude)
+
+
+class RequireAllUniformityTest(unittest.TestCase):
+
+    def setUp(self):
+        # Seeded so the outcome does not depend on luck
+        seed_random(2024)
+
+    def tearDown(self):
+        seed_random()
+
+    def check_uniform(self, policy, length, per_password, one_at_a_time=False):
+        valid = set()
+        for chars in itertools.product(policy.alphabet, repeat=length):
+            password = ''.join(chars)
+            if policy.contains_all_types(password):
+                valid.add(password)
+        if one_at_a_time:
+            counts = collections.Counter(generate_batch(policy, length, 1)[0]
+                                         for _ in range(len(valid) * per_password))
+        else:
+            counts = collections.Counter(generate_batch(policy, length, len(valid) * per_password))
+        self.assertEqual(set(counts), valid)
+        chi_square = sum((count - per_password) ** 2 for count in counts.values()) / per_password
+        degrees = len(valid) - 1
+        # Far above any plausible value for a uniform distribution
+        self.assertLess(chi_square, degrees + 6 * (2 * degrees) ** 0.5)
+
+    def test_shortest_length(self):
+        self.check_uniform(small_policy('AB', 'a', '23'), 3, 200)
+
+    def test_longer_than_sets(self):
+        self.check_uniform(small_policy('AB', 'a', '23'), 5, 40)
+
+    def test_longer_than_block(self):
+        # Three sets are drawn six characters at a time, so this takes two blocks
+        self.check_uniform(small_policy('A', 'a', '2'), 9, 20)
+
+    def test_unfinished_passwords_one_at_a_time(self):
+        # Two sets are drawn ten characters at a time. Few passwords have a
+        # first block from one set, so those finish one at a time
+        self.check_uniform(small_policy('A', 'a', ''), 13, 20)
+
+    def test_single_passwords(self):
+        self.check_uniform(small_policy('AB', 'a', '23'), 5, 40, one_at_a_time=True)
+        self.check_uniform(small_policy('A', 'a', '2'), 9, 20, one_at_a_time=True)
+
+    def test_every_batch_size(self):
+        policy = compile_policy()
+        for count in (1, 2, 7, 100):
+            passwords = generate_batch(policy, 4, count)
+            self.assertEqual(len(passwords), count)
+            for password in passwords:
+                self.assertEqual(len(password), 4)
+                self.assertTrue(policy.contains_all_types(password))
+
+    def test_long_passwords(self):
+        policy = compile_policy()
+        for password in generate_batch(policy, 300, 20):
+            self.assertEqual(len(password), 300)
+            self.assertTrue(policy.contains_all_types(password))
+
+    def test_seeded_runs_repeat(self):
+        policy = compile_policy()
+        seed_random(7)
+        first = generate_batch(policy, 16, 10)
+        seed_random(7)
+        self.assertEqual(generate_batch(policy, 16, 10), first)
+
+
+class TemplateTest(unittest.TestCase):
+
+    def test_placeholders_and_literals(self):
+        template = compile_template('Aa9!*-x', no_similar=False)
+        self.assertEqual(template.length, 7)
+        allowed = (UPPERCASE, LOWERCASE, DIGITS, SYMBOLS, UPPERCASE + LOWERCASE + DIGITS + SYMBOLS, '-', 'x')
+        for password in generate_from_template(template, 200):
+            self.assertEqual(len(password), 7)
+            for char, chars in zip(password, allowed):
+                self.assertIn(char, chars)
+
+    def test_every_position_varies(self):
+        seed_random(11)
+        try:
+            passwords = generate_from_template(compile_template('A{3}-9{3}'), 300)
+        finally:
+            seed_random()
+        for position in (0, 1, 2, 4, 5, 6):
+            self.assertGreater(len({password[position] for password in passwords}), 5)
+
+    def test_repeats_and_escapes(self):
+        self.assertEqual(compile_template('Aa{3}-9{4}-!{2}').length, len('Aaaa-9999-!!'))
+        self.assertEqual(generate_from_template(compile_template('\\A\\9x{3}'), 1), ['A9xxx'])
+        self.assertEqual(generate_from_template(compile_template('-{0}\\*'), 1), ['*'])
+
+    def test_exclusions(self):
+        template = compile_template('*{50}', no_similar=True, exclude='ABC')
+        for password in generate_from_template(template, 20):
+            self.assertFalse(set(password) & set(SIMILAR_CHARS + 'ABC'))
+
+    def test_batch_sizes(self):
+        template = compile_template('a9')
+        self.assertEqual(generate_from_template(template, 0), [])
+        self.assertEqual(len(generate_from_template(template, 1)), 1)
+        self.assertEqual(len(generate_from_template(template, 1000)), 1000)
+
+    def test_entropy(self):
+        template = compile_template('Aa-9', no_similar=False)
+        self.assertAlmostEqual(template.entropy(), math.log2(26 * 26 * 10))
+        self.assertEqual(compile_template('fixed').entropy(), 0)
+
+    def test_shared_and_immutable(self):
+        template = compile_template('Aaaa-9999')
+        self.assertIs(compile_template('Aaaa-9999'), template)
+        with self.assertRaises(AttributeError):
+            template.length = 3
+
+    def test_invalid_templates(self):
+        for pattern in ('', 'a{0}', 'Aa\\', 'a{', 'a{x}', 'a{-1}', 'caf\u00e9', 'tab\t'):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    compile_template(pattern)
+        with self.assertRaises(ValueError):
+            compile_template('9', exclude=DIGITS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# test_estimator.py
+"""
+Tests for the strength estimator: the patterns it finds, the guesses it
+charges for them and the labels given to the resulting entropy.
+
+Run with "python -m pytest" or "python -m unittest" from this directory.
+"""
+import math
+import unittest
+
+from strength_estimator import STRENGTH_LEVELS, add_words, estimate_strength, strength_label
+
+
+class PatternTest(unittest.TestCase):
+
+    def patterns(self, password):
+        return [(match.pattern, match.token) for match in estimate_strength(password).matches]
+
+    def test_dictionary_words(self):
+        for password in ('password', 'Password', 'PASSWORD', 'drowssap'):
+            with self.subTest(password=password):
+                self.assertEqual(self.patterns(password), [('dictionary', password)])
+
+    def test_l33t_words(self):
+        self.assertEqual(self.patterns('p@ssw0rd'), [('l33t', 'p@ssw0rd')])
+        # Each substitution doubles the guesses
+        self.assertGreater(estimate_strength('m0nk3y!x').guesses, estimate_strength('monkey!x').guesses)
+
+    def test_repeats(self):
+        self.assertEqual(self.patterns('aaaaaa'), [('repeat', 'aaaaaa')])
+        self.assertEqual(self.patterns('abcabcabc'), [('repeat', 'abcabcabc')])
+
+    def test_sequences(self):
+        for password in ('abcdef', '9876', '2468'):
+            with self.subTest(password=password):
+                self.assertEqual(self.patterns(password), [('sequence', password)])
+
+    def test_keyboard_walks(self):
+        for password in ('asdfgh', 'zxcvbn', '1qaz'):
+            with self.subTest(password=password):
+                self.assertEqual([pattern for pattern, _ in self.patterns(password)], ['keyboard'])
+
+    def test_patterns_are_combined(self):
+        patterns = [pattern for pattern, _ in self.patterns('monkey2468zxcvbn')]
+        self.assertEqual(patterns, ['dictionary', 'sequence', 'keyboard'])
+
+    def test_added_words(self):
+        before = estimate_strength('xylophonic').guesses
+        add_words(['xylophonic'])
+        self.assertEqual(self.patterns('xylophonic'), [('dictionary', 'xylophonic')])
+        self.assertLess(estimate_strength('xylophonic').guesses, before)
+
+
+class EstimateTest(unittest.TestCase):
+
+    def test_empty_password(self):
+        self.assertEqual(estimate_strength(''), (1, 0.0, ()))
+
+    def test_random_passwords_use_brute_force(self):
+        estimate = estimate_strength('xK9#mQ2$vL')
+        self.assertEqual(estimate.matches, ())
+        # Lowercase, uppercase, digits and symbols
+        self.assertEqual(estimate.guesses, 95 ** 10)
+        self.assertAlmostEqual(estimate.bits, 10 * math.log2(95))
+
+    def test_patterns_are_cheaper_than_brute_force(self):
+        for password in ('password123', 'qwerty', 'abcdefgh', 'aaaaaaaaaa', 'Summer2024'):
+            with self.subTest(password=password):
+                self.assertLess(estimate_strength(password).guesses, _cardinality_guesses(password))
+
+    def test_longer_is_stronger(self):
+        self.assertLess(estimate_strength('kX7!qZ').bits, estimate_strength('kX7!qZp2#W').bits)
+
+    def test_results_are_cached(self):
+        self.assertIs(estimate_strength('correct horse'), estimate_strength('correct horse'))
+
+    def test_labels(self):
+        for minimum, label in STRENGTH_LEVELS:
+            with self.subTest(label=label):
+                self.assertEqual(strength_label(minimum), label)
+        self.assertEqual(strength_label(79.9), STRENGTH_LEVELS[1][1])
+        self.assertEqual(strength_label(-1), STRENGTH_LEVELS[-1][1])
+        self.assertEqual(strength_label(estimate_strength('password').bits), STRENGTH_LEVELS[-1][1])
+
+
+def _cardinality_guesses(password):
+    """Guesses to brute force password over the character classes it uses"""
+    pool = sum(size for check, size in ((str.islower, 26), (str.isupper, 26), (str.isdigit, 10))
+               if any(check(char) for char in password))
+    if not password.isalnum():
+        pool += 33
+    return max(pool, 10) ** len(password)
+
+
+if __name__ == '__main__':
+    unittest.main()
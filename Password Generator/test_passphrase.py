@@ -0,0 +1,158 @@
+# test_passphrase.py
+"""
+Tests for passphrase generation: reading wordlists through their offset
+index, keeping the index in step with the wordlist, and the passphrase
+options and their entropy.
+
+Run with "python -m pytest" or "python -m unittest" from this directory.
+"""
+import collections
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from passphrase import INDEX_HEADER, Wordlist, generate_passphrase, passphrase_entropy
+from password_engine import seed_random
+
+
+class WordlistTestCase(unittest.TestCase):
+    """Gives each test a temporary directory to write wordlists to"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'wordlist.txt')
+        self.wordlists = []
+
+    def tearDown(self):
+        for wordlist in self.wordlists:
+            wordlist.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def open_wordlist(self):
+        wordlist = Wordlist(self.path)
+        self.wordlists.append(wordlist)
+        return wordlist
+
+    def words(self, wordlist):
+        return [wordlist[i] for i in range(len(wordlist))]
+
+
+class WordlistTest(WordlistTestCase):
+
+    def test_plain_and_dice_lines(self):
+        self.write(b'apple\n11112\tbanana\r\n\n   \n11113 cherry\ndate')
+        self.assertEqual(self.words(self.open_wordlist()), ['apple', 'banana', 'cherry', 'date'])
+
+    def test_out_of_range(self):
+        self.write(b'apple\nbanana\n')
+        wordlist = self.open_wordlist()
+        with self.assertRaises(IndexError):
+            wordlist[2]
+        with self.assertRaises(IndexError):
+            wordlist[-1]
+
+    def test_index_is_written_and_reused(self):
+        self.write(b'apple\nbanana\n')
+        self.open_wordlist()
+        index_path = self.path + '.idx'
+        self.assertEqual(os.path.getsize(index_path), INDEX_HEADER.size + 2 * 16)
+        modified = os.stat(index_path).st_mtime_ns
+
+        self.assertEqual(self.words(self.open_wordlist()), ['apple', 'banana'])
+        self.assertEqual(os.stat(index_path).st_mtime_ns, modified)
+
+    def test_stale_index_is_rebuilt(self):
+        self.write(b'apple\nbanana\n')
+        self.open_wordlist().close()
+        self.wordlists.clear()
+        self.write(b'cherry\ndate\nelder\n')
+        stat = os.stat(self.path)
+        # Make sure the change shows even on coarse file timestamps
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        self.assertEqual(self.words(self.open_wordlist()), ['cherry', 'date', 'elder'])
+
+    def test_damaged_index_is_rebuilt(self):
+        self.write(b'apple\nbanana\n')
+        self.open_wordlist().close()
+        self.wordlists.clear()
+        with open(self.path + '.idx', 'r+b') as f:
+            f.truncate(INDEX_HEADER.size + 8)
+
+        self.assertEqual(self.words(self.open_wordlist()), ['apple', 'banana'])
+
+    def test_empty_wordlists(self):
+        for data in (b'', b'\n \n\t\n'):
+            with self.subTest(data=data):
+                self.write(data)
+                with self.assertRaises(ValueError):
+                    self.open_wordlist()
+
+
+class PassphraseTest(WordlistTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # No word plus a digit is another word
+        self.write(b'\n'.join(f'word{letter}'.encode('ascii') for letter in 'abcdefghijklmnop') + b'\n')
+        self.wordlist = self.open_wordlist()
+        # Seeded so the outcome does not depend on luck
+        seed_random(2024)
+
+    def tearDown(self):
+        seed_random()
+        super().tearDown()
+
+    def test_words_and_separator(self):
+        words = generate_passphrase(self.wordlist, 5, separator=' ').split(' ')
+        self.assertEqual(len(words), 5)
+        for word in words:
+            self.assertIn(word, self.words(self.wordlist))
+
+    def test_words_are_uniform(self):
+        counts = collections.Counter()
+        for _ in range(400):
+            counts.update(generate_passphrase(self.wordlist, 4).split('-'))
+        self.assertEqual(set(counts), set(self.words(self.wordlist)))
+        expected = 400 * 4 / 16
+        chi_square = sum((count - expected) ** 2 for count in counts.values()) / expected
+        # Far above any plausible value for 15 degrees of freedom
+        self.assertLess(chi_square, 15 + 6 * 30 ** 0.5)
+
+    def test_capitalize(self):
+        for word in generate_passphrase(self.wordlist, 8, capitalize='all').split('-'):
+            self.assertTrue(word.startswith('Word'))
+        styles = set()
+        for _ in range(20):
+            styles.update(word[0] for word in generate_passphrase(self.wordlist, 8, capitalize='random').split('-'))
+        self.assertEqual(styles, {'W', 'w'})
+
+    def test_add_digit(self):
+        for _ in range(50):
+            words = generate_passphrase(self.wordlist, 3, add_digit=True).split('-')
+            extended = [word for word in words if word not in self.words(self.wordlist)]
+            self.assertEqual(len(extended), 1)
+            self.assertIn(extended[0][:-1], self.words(self.wordlist))
+            self.assertTrue(extended[0][-1].isdigit())
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            generate_passphrase(self.wordlist, 0)
+        with self.assertRaises(ValueError):
+            generate_passphrase(self.wordlist, 4, capitalize='upper')
+
+    def test_entropy(self):
+        self.assertAlmostEqual(passphrase_entropy(7776, 6), 6 * math.log2(7776))
+        self.assertAlmostEqual(passphrase_entropy(16, 4, capitalize='all'), 16)
+        self.assertAlmostEqual(passphrase_entropy(16, 4, capitalize='random'), 20)
+        self.assertAlmostEqual(passphrase_entropy(16, 4, add_digit=True), 16 + math.log2(40))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,441 @@
+# test_vault.py
+"""
+Tests for the password vault: crash recovery of the journal and snapshot,
+sharing one vault between several open instances, rotating entries,
+searching them and importing and exporting them.
+
+Run with "python -m pytest" or "python -m unittest" from this directory.
+"""
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from password_vault import (JournalVault, PasswordReuseIndex, TrigramSearchIndex, VaultFormatError, downgrade_vault,
+                            export_vault, import_entries, iter_import_file)
+
+
+def make_entry(website, username='user', password='secret', created_at='2024-01-01 12:00:00'):
+    """Build a saved entry dict"""
+    return {
+        'website': website,
+        'username': username,
+        'password': password,
+        'notes': '',
+        'created_at': created_at,
+        'length': len(password),
+        'strength': 'Strong',
+    }
+
+
+class VaultTestCase(unittest.TestCase):
+    """Gives each test an empty vault path in its own temporary directory"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'saved_passwords.json')
+        self.vaults = []
+
+    def tearDown(self):
+        for vault in self.vaults:
+            vault.lock.close()
+        shutil.rmtree(self.directory)
+
+    def open_vault(self, **options):
+        vault = JournalVault(self.path, **options)
+        self.vaults.append(vault)
+        return vault
+
+    def reopen(self):
+        """Load the vault with a fresh instance, as a new process would"""
+        vault = self.open_vault()
+        return [record.to_dict() for record in vault.load()]
+
+    def streamed(self):
+        return list(self.open_vault().iter_entries())
+
+    def websites(self, entries):
+        return [entry['website'] for entry in entries]
+
+
+class TornJournalTest(VaultTestCase):
+
+    def test_torn_last_line_is_dropped(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('a.com'), make_entry('b.com')])
+        with open(vault.journal_path, 'a') as f:
+            # A crash in the middle of an append
+            f.write('{"website":"c.com","username":"us')
+
+        self.assertEqual(self.websites(self.streamed()), ['a.com', 'b.com'])
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'b.com'])
+        with open(vault.journal_path, 'rb') as f:
+            self.assertTrue(f.read().endswith(b'\n'))
+
+    def test_append_after_torn_line(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.append(make_entry('a.com'))
+        with open(vault.journal_path, 'a') as f:
+            f.write('{"website":"b.c')
+
+        vault = self.open_vault()
+        vault.load()
+        vault.append(make_entry('c.com'))
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'c.com'])
+
+    def test_unloaded_writes_after_torn_line(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.append(make_entry('a.com'))
+        with open(vault.journal_path, 'a') as f:
+            f.write('{"website":"b.com","us')
+
+        # Importing streams into a vault that is never loaded
+        self.assertEqual(import_entries(self.open_vault(), [make_entry('c.com'), make_entry('d.com')]), (2, 0))
+        self.open_vault().append(make_entry('e.com'))
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'c.com', 'd.com', 'e.com'])
+
+
+class InterruptedCompactionTest(VaultTestCase):
+
+    def compact_interrupted(self, vault):
+        """Compact, failing after the snapshot was replaced but before the journal was reset"""
+        def crash(base, generation):
+            raise OSError("Simulated crash")
+
+        vault._reset_journal = crash
+        with self.assertRaises(OSError):
+            vault.compact()
+        del vault._reset_journal
+
+    def test_entries_not_added_twice(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('a.com'), make_entry('b.com')])
+        vault.compact()
+        vault.append(make_entry('c.com'))
+        expected = self.reopen()
+
+        self.compact_interrupted(vault)
+        self.assertEqual(self.streamed(), expected)
+        self.assertEqual(self.reopen(), expected)
+        # Loading reset the journal, so the next save lands once
+        vault = self.open_vault()
+        vault.load()
+        vault.append(make_entry('d.com'))
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'b.com', 'c.com', 'd.com'])
+
+    def test_first_compaction_interrupted(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('a.com'), make_entry('b.com')])
+        expected = self.reopen()
+
+        self.compact_interrupted(vault)
+        self.assertEqual(self.streamed(), expected)
+        self.assertEqual(self.reopen(), expected)
+
+
+class SnapshotFormatTest(VaultTestCase):
+
+    def test_unknown_format_not_overwritten(self):
+        with open(self.path, 'w') as f:
+            f.write('[{"format":99,"generation":"0123456789abcdef"},{"website":["a.com"]}]')
+        with open(self.path, 'rb') as f:
+            snapshot = f.read()
+
+        with self.assertRaises(VaultFormatError):
+            self.open_vault().load()
+        with self.assertRaises(VaultFormatError):
+            self.open_vault().compact()
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), snapshot)
+
+    def test_downgrade_writes_original_format(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('a.com'), make_entry('b.com')])
+        vault.compact()
+        vault.rotate(0, make_entry('a.com', password='rotated'))
+        vault.append(make_entry('c.com'))
+        expected = self.reopen()
+
+        self.assertEqual(downgrade_vault(self.path), 3)
+        self.assertFalse(os.path.exists(vault.journal_path))
+        # Exactly what the original app wrote, so it can read it back
+        with open(self.path) as f:
+            text = f.read()
+        self.assertEqual(text, json.dumps(expected, indent=2))
+        self.assertEqual(self.reopen(), expected)
+
+    def test_downgrade_empty_vault(self):
+        self.assertEqual(downgrade_vault(self.path), 0)
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), [])
+
+    def test_unloaded_compaction_keeps_saved_entries(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('a.com'), make_entry('b.com')])
+        vault.compact()
+
+        # Compacts right after the append, without having been loaded
+        self.open_vault(compact_every=1).append(make_entry('c.com'))
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'b.com', 'c.com'])
+
+    def test_original_format_rewritten_on_load(self):
+        entries = [make_entry('a.com'), make_entry('b.com')]
+        with open(self.path, 'w') as f:
+            json.dump(entries, f, indent=2)
+
+        loaded = self.open_vault().load()
+        self.assertEqual(self.websites(loaded), ['a.com', 'b.com'])
+        with open(self.path) as f:
+            self.assertIn('format', json.load(f)[0])
+        self.assertEqual(self.reopen(), loaded)
+
+    def test_unreadable_snapshot_not_rewritten(self):
+        with open(self.path, 'w') as f:
+            f.write('[{"website": "a.com",')
+        vault = self.open_vault()
+        vault.load()
+        vault.append(make_entry('b.com'))
+
+        self.assertEqual(self.websites(self.open_vault().load()), ['b.com'])
+        with open(self.path) as f:
+            self.assertEqual(f.read(), '[{"website": "a.com",')
+
+
+class TwoInstanceTest(VaultTestCase):
+
+    def test_refresh_picks_up_appends(self):
+        first = self.open_vault()
+        second = self.open_vault()
+        first.load()
+        first.extend([make_entry('a.com'), make_entry('b.com')])
+        second.load()
+
+        first.append(make_entry('c.com'))
+        self.assertTrue(second.has_changed())
+        self.assertTrue(second.refresh())
+        self.assertEqual(second.entries, first.entries)
+        self.assertFalse(second.refresh())
+
+    def test_refresh_after_compaction_by_other(self):
+        first = self.open_vault()
+        second = self.open_vault()
+        first.load()
+        first.extend([make_entry('a.com')])
+        second.load()
+
+        first.append(make_entry('b.com'))
+        first.compact()
+        self.assertTrue(second.refresh())
+        self.assertEqual(second.entries, first.entries)
+        # Both keep writing on top of the new snapshot
+        second.append(make_entry('c.com'))
+        first.append(make_entry('d.com'))
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'b.com', 'c.com', 'd.com'])
+
+    def test_append_catches_up_first(self):
+        first = self.open_vault()
+        second = self.open_vault()
+        first.load()
+        second.load()
+
+        first.append(make_entry('a.com'))
+        second.append(make_entry('b.com'))
+        self.assertEqual(self.websites(second.entries), ['a.com', 'b.com'])
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'b.com'])
+
+
+class RotationTest(VaultTestCase):
+
+    def rotated_vault(self):
+        """Vault with two compacted entries and a journal holding only a rotation of the second"""
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('a.com'), make_entry('b.com')])
+        vault.compact()
+        vault.rotate(1, make_entry('b.com', password='rotated', created_at='2024-02-01 12:00:00'))
+        return vault
+
+    def test_rotation_keeps_history(self):
+        self.rotated_vault()
+        entries = self.reopen()
+        self.assertEqual([entry['password'] for entry in entries], ['secret', 'rotated'])
+        self.assertEqual(entries[1]['history'], [['secret', '2024-01-01 12:00:00']])
+        self.assertEqual(self.streamed(), entries)
+
+    def test_interrupted_compaction_applies_rotation_once(self):
+        vault = self.rotated_vault()
+        expected = self.reopen()
+
+        def crash(base, generation):
+            raise OSError("Simulated crash")
+
+        vault._reset_journal = crash
+        with self.assertRaises(OSError):
+            vault.compact()
+        del vault._reset_journal
+        # Counting entries cannot tell whether this journal was folded in
+        self.assertEqual(self.streamed(), expected)
+        self.assertEqual(self.reopen(), expected)
+
+    def test_rotation_follows_its_entry(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('b.com')])
+        vault.rotate(0, make_entry('b.com', password='other'))
+        # A rotation written for a.com, which is no longer at that position
+        with open(vault.journal_path, 'a') as f:
+            f.write('{"rotate":0,"website":"a.com","username":"user","password":"wrong","notes":"",'
+                    '"created_at":"2024-03-01 12:00:00","length":5,"strength":"Weak"}\n')
+        self.assertEqual([entry['password'] for entry in self.reopen()], ['other'])
+        self.assertEqual([entry['password'] for entry in self.streamed()], ['other'])
+
+    def test_refresh_reports_rotations(self):
+        first = self.open_vault()
+        second = self.open_vault()
+        first.load()
+        first.extend([make_entry('a.com'), make_entry('b.com')])
+        second.load()
+        previous = second.entries[0]
+
+        first.rotate(0, make_entry('a.com', password='rotated'))
+        self.assertTrue(second.refresh())
+        self.assertEqual(second.entries, first.entries)
+        self.assertEqual(second.take_rotated(), [(0, previous)])
+        self.assertEqual(second.take_rotated(), [])
+
+    def test_indexes_updated_in_place(self):
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('github.com', password='shared'), make_entry('gitlab.com', password='shared'),
+                      make_entry('example.org')])
+        search = TrigramSearchIndex(vault.entries)
+        reuse = PasswordReuseIndex(vault.entries)
+        # Cache a bitset the update has to change
+        search.search('github')
+        vault.take_rotated()
+
+        record = vault.rotate(0, dict(make_entry('github.com', password='unique'), notes='work account'))
+        for position, previous in vault.take_rotated():
+            search.update(position, previous, vault.entries[position])
+            reuse.update(position, previous['password'], vault.entries[position]['password'])
+        self.assertEqual(record['notes'], 'work account')
+
+        fresh = TrigramSearchIndex(vault.entries)
+        for query in ('github', 'work', 'gitlab', 'example'):
+            self.assertEqual(list(search.search(query)), list(fresh.search(query)))
+        self.assertEqual(reuse.find('shared'), [1])
+        self.assertEqual(reuse.find('unique'), [0])
+        self.assertEqual(reuse.duplicates(), [])
+
+
+class ImportExportTest(VaultTestCase):
+
+    def filled_vault(self):
+        """Vault with a compacted entry, a rotated one and one only in the journal"""
+        vault = self.open_vault()
+        vault.load()
+        vault.extend([make_entry('a.com'), dict(make_entry('b.com', 'bob'), notes='note, with "quotes"')])
+        vault.compact()
+        vault.rotate(0, make_entry('a.com', password='rotated', created_at='2024-02-01 12:00:00'))
+        vault.append(make_entry('c.com'))
+        return vault
+
+    def exported(self, fmt):
+        output = io.StringIO(newline='')
+        self.assertEqual(export_vault(self.open_vault(), output, fmt), 3)
+        output.seek(0)
+        return output
+
+    def import_into_new_vault(self, source, fmt):
+        self.path = os.path.join(self.directory, 'imported.json')
+        return import_entries(self.open_vault(), iter_import_file(source, fmt))
+
+    def test_jsonl_round_trip(self):
+        self.filled_vault()
+        expected = self.reopen()
+        self.assertEqual(self.import_into_new_vault(self.exported('jsonl'), 'jsonl'), (3, 0))
+        self.assertEqual(self.reopen(), expected)
+        self.assertEqual(expected[0]['history'], [['secret', '2024-01-01 12:00:00']])
+
+    def test_csv_round_trip(self):
+        self.filled_vault()
+        expected = self.reopen()
+        self.assertEqual(self.import_into_new_vault(self.exported('csv'), 'csv'), (3, 0))
+        for entry in expected:
+            # CSV has no column for previous versions
+            entry.pop('history', None)
+        self.assertEqual(self.reopen(), expected)
+
+    def test_duplicates_skipped(self):
+        vault = self.filled_vault()
+        self.assertEqual(import_entries(self.open_vault(), iter_import_file(self.exported('jsonl'))), (0, 3))
+        repeated = [make_entry('d.com'), make_entry('d.com'), make_entry('d.com', password='other')]
+        self.assertEqual(import_entries(vault, repeated), (2, 1))
+        self.assertEqual(self.websites(self.reopen()), ['a.com', 'b.com', 'c.com', 'd.com', 'd.com'])
+
+    def test_incomplete_records(self):
+        source = io.StringIO('{"website":"a.com","username":"user","password":"pw"}\n'
+                             '\n'
+                             '{"website":"b.com","username":"user"}\n'
+                             '["not", "a", "record"]\n')
+        entries = list(iter_import_file(source))
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['length'], 2)
+        self.assertTrue(entries[0]['strength'])
+        self.assertTrue(entries[0]['created_at'])
+
+
+class SearchTest(unittest.TestCase):
+
+    def expected(self, index, entries, query, limit=None):
+        """Rank entries by shared trigrams the slow way"""
+        trigrams = index._trigrams(query)
+        needed = max(1, math.ceil(len(trigrams) * index.MIN_SIMILARITY))
+        counts = [len(trigrams & index._entry_trigrams(entry)) for entry in entries]
+        ranked = sorted((-count, position) for position, count in enumerate(counts) if count >= needed)
+        return [position for _, position in ranked][:limit]
+
+    def test_counts_above_counter_bits(self):
+        # Two entries match two trigrams each, so the counters only have two
+        # bits; no entry reaches the three trigrams needed
+        index = TrigramSearchIndex([make_entry(website) for website in
+                                    ('abzz.com', 'zbcdz.com', 'zzcd', 'unrelated.net', 'other.org')])
+        self.assertEqual(list(index.search('abcd')), [])
+
+    def test_ranking_matches_slow_search(self):
+        entries = [make_entry(website, username) for website, username in (
+            ('github.com', 'octocat'), ('gitlab.com', 'octocat'), ('gist.github.com', 'cat'),
+            ('example.org', 'admin'), ('mail.example.org', 'admin'), ('bank.example', 'me'),
+        )]
+        entries[3]['notes'] = 'github backup'
+        index = TrigramSearchIndex(entries)
+        for query in ('github', 'gthub', 'example', 'octo', 'git', 'cat', 'admin mail', 'zzz', 'a'):
+            self.assertEqual(list(index.search(query)), self.expected(index, entries, query), query)
+        self.assertEqual(list(index.search('github', limit=2)), self.expected(index, entries, 'github', 2))
+
+    def test_empty_query_matches_everything(self):
+        index = TrigramSearchIndex([make_entry('a.com'), make_entry('b.com'), make_entry('c.com')])
+        self.assertEqual(list(index.search('  ')), [0, 1, 2])
+        self.assertEqual(list(index.search('', limit=2)), [0, 1])
+
+    def test_entries_added_after_search(self):
+        index = TrigramSearchIndex([make_entry('github.com')])
+        self.assertEqual(list(index.search('github')), [0])
+        # The cached bitsets take in the new entry
+        index.add(make_entry('example.org'))
+        index.add(make_entry('github.io'))
+        self.assertEqual(list(index.search('github')), [0, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+# vault_audit.py
+"""
+Security audit of every saved password.
+
+Reports entries that are weak, short, reused or found in the offline
+breached password filter, and entries whose saved strength label no longer
+matches what the strength estimator says today. Scoring is the expensive
+part, so the vault is split into chunks that are scored in a process pool,
+with progress reported as each chunk finishes:
+
+    python vault_audit.py saved_passwords.json --workers 0
+"""
+import os
+import sys
+from collections import namedtuple
+
+from breach_filter import DEFAULT_FILTER_FILE, load_breach_filter
+from password_vault import PasswordReuseIndex, open_vault
+from strength_estimator import STRENGTH_LEVELS, estimate_strength, strength_label
+
+# Entries below the "Good" strength level are reported as weak
+WEAK_BITS = STRENGTH_LEVELS[2][0]
+MIN_RECOMMENDED_LENGTH = 12
+DEFAULT_CHUNK_SIZE = 5000
+
+AuditReport = namedtuple('AuditReport', ['total', 'weak', 'short', 'reused', 'breached', 'stale'])
+
+# Breached password filter opened once in each worker process
+_worker_filter = None
+
+
+def _init_worker(filter_path):
+    global _worker_filter
+    _worker_filter = load_breach_filter(filter_path) if filter_path else None
+
+
+def _audit_records(start, records, breach_filter, weak_bits, min_length):
+    """
+    Check one chunk of (password, saved strength) records
+
+    Returns:
+        tuple: Positions of weak, short and breached entries, and
+        (position, current label) pairs for stale labels
+    """
+    weak, short, breached, stale = [], [], [], []
+    for position, (password, saved_strength) in enumerate(records, start):
+        bits = estimate_strength(password).bits
+        if bits < weak_bits:
+            weak.append(position)
+        if len(password) < min_length:
+            short.append(position)
+        if breach_filter is not None and password in breach_filter:
+            breached.append(position)
+        label = strength_label(bits)
+        if saved_strength != label:
+            stale.append((position, label))
+    return weak, short, breached, stale
+
+
+def _audit_chunk(start, records, weak_bits, min_length):
+    """Check one chunk in a worker process, module-level so it can be pickled"""
+    return _audit_records(start, records, _worker_filter, weak_bits, min_length)
+
+
+def _iter_chunks(entries, chunk_size):
+    """Yield (start, records) chunks holding only what the audit needs"""
+    for start in range(0, len(entries), chunk_size):
+        records = [(entry['password'], entry.get('strength', ''))
+                   for entry in entries[start:start + chunk_size]]
+        yield start, records
+
+
+def audit_entries(entries, filter_path=DEFAULT_FILTER_FILE, workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                  progress=None, weak_bits=WEAK_BITS, min_length=MIN_RECOMMENDED_LENGTH):
+    """
+    Audit saved entries for weak, short, reused, breached and stale ones
+
+    Args:
+        entries (list): Saved entries, as loaded from the vault
+        filter_path (str): Breached password filter, skipped if it does not exist
+        workers (int): Number of processes to score with
+        chunk_size (int): Entries scored per task
+        progress (callable): Called as progress(audited, total) after each chunk
+        weak_bits (float): Entropy below which an entry is weak
+        min_length (int): Length below which an entry is short
+
+    Returns:
+        AuditReport: Entry positions per finding; reused is a list of groups
+        and stale holds (position, current label) pairs
+    """
+    total = len(entries)
+    weak, short, breached, stale = [], [], [], []
+
+    def collect(chunk_result):
+        for found, chunk_found in zip((weak, short, breached, stale), chunk_result):
+            found.extend(chunk_found)
+
+    done = 0
+    if workers <= 1 or total <= chunk_size:
+        breach_filter = load_breach_filter(filter_path) if filter_path else None
+        try:
+            for start, records in _iter_chunks(entries, chunk_size):
+                collect(_audit_records(start, records, breach_filter, weak_bits, min_length))
+                done += len(records)
+                if progress is not None:
+                    progress(done, total)
+        finally:
+            if breach_filter is not None:
+                breach_filter.close()
+    else:
+        # Vaults small enough for the inline branch above never import these
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Spawned rather than forked, so auditing from the GUI never forks
+        # a process that is running Tk and other threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(filter_path,)) as executor:
+            pending = []
+
+            def finish_oldest():
+                nonlocal done
+                size, future = pending.pop(0)
+                collect(future.result())
+                done += size
+                if progress is not None:
+                    progress(done, total)
+
+            for start, records in _iter_chunks(entries, chunk_size):
+                pending.append((len(records), executor.submit(_audit_chunk, start, records, weak_bits, min_length)))
+                if len(pending) >= workers * 2:
+                    finish_oldest()
+            while pending:
+                finish_oldest()
+
+    reused = PasswordReuseIndex(entries).duplicates()
+    return AuditReport(total, weak, short, reused, breached, stale)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Audit saved passwords for weak, reused and breached entries")
+    parser.add_argument('path', nargs='?', default='saved_passwords.json')
+    parser.add_argument('--filter', default=DEFAULT_FILTER_FILE,
+                        help="Breached password filter (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes to score with (0 for one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Entries scored per task (default: %(default)s)")
+    parser.add_argument('--min-length', type=int, default=MIN_RECOMMENDED_LENGTH,
+                        help="Report passwords shorter than this (default: %(default)s)")
+    parser.add_argument('--details', action='store_true', help="List every flagged entry")
+    args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error("chunk size must be at least 1")
+
+    entries = open_vault(args.path).load()
+
+    def show_progress(done, total):
+        print(f"\rAudited {done}/{total} entries", end='', file=sys.stderr, flush=True)
+
+    report = audit_entries(entries, args.filter, args.workers or os.cpu_count() or 1,
+                           args.chunk_size, show_progress, min_length=args.min_length)
+    if entries:
+        print(file=sys.stderr)
+
+    def describe(position):
+        entry = entries[position]
+        return f"{entry['website']} ({entry['username']})"
+
+    findings = (
+        ("Weak", report.weak),
+        (f"Shorter than {args.min_length}", report.short),
+        ("Breached", report.breached),
+    )
+    print(f"Audited {report.total} saved passwords")
+    for title, positions in findings:
+        print(f"{title}: {len(positions)}")
+        if args.details:
+            for position in positions:
+                print(f"  {describe(position)}")
+    print(f"Reused: {sum(len(group) for group in report.reused)} entries sharing {len(report.reused)} passwords")
+    if args.details:
+        for group in report.reused:
+            print(f"  {', '.join(describe(position) for position in group)}")
+    print(f"Outdated strength label: {len(report.stale)}")
+    if args.details:
+        for position, label in report.stale:
+            print(f"  {describe(position)}: {entries[position].get('strength', '')} -> {label}")
+
+
+if __name__ == "__main__":
+    main()